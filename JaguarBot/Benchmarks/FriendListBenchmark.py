@@ -0,0 +1,107 @@
+""" Compares the streaming friend list decode with a full `loads` on large friend lists.
+
+    Run from the 'Source' folder: python ../Benchmarks/FriendListBenchmark.py """
+
+import sys
+from json import dumps, loads
+from os import path
+from random import Random
+from statistics import median
+from time import perf_counter
+from tracemalloc import start, stop, get_traced_memory, reset_peak
+
+sys.path.insert(0, path.join(path.dirname(path.abspath(__file__)), "..", "Source"))
+
+from Helpers.JSONStream import iterArray
+
+
+FRIEND_COUNTS   = [500, 1000]
+PLAYING_RATIOS  = [0.05, 0.5]
+REPEATS         = 50
+
+STREAM_PATH = ("data", "friends", "nodes")
+IDLE_STATES = ("ONLINE", "OFFLINE")
+PLAYING_STATES = ["VS_MODE_FIGHTING", "COOP_MODE_FIGHTING", "VS_MODE_MATCHING"]
+
+
+def buildPayload(rng: Random, friends: int, playing: int) -> str:
+    """ Return a friend list response, playing friends sorted first like SplatNet3 does. """
+    nodes = []
+    for i in range(friends):
+        state = rng.choice(PLAYING_STATES) if i < playing else rng.choice(IDLE_STATES)
+        nodes.append({
+            "id":          f"RnJpZW5kLXUtcXh4eHh4eHh4eHh4eHh4eHh4eHh4{i:08d}",
+            "onlineState": state,
+            "nickname":    f"Nick{i}",
+            "playerName":  f"Player{i}",
+            "userIcon": {
+                "url":    f"https://cdn-image-e0d67c509fb203858ebcb2fe3f88c2aa.baas.nintendo.com/1/{i:016x}",
+                "width":  256,
+                "height": 256
+            },
+            "vsMode":      {"id": "VnNNb2RlLTI=", "mode": "BANKARA", "name": "Anarchy Battle"} if state.startswith("VS") else None,
+            "coopRule":    "REGULAR" if state.startswith("COOP") else None,
+            "isFavorite":  False,
+            "isLocked":    i % 7 == 0,
+            "isVcEnabled": False
+        })
+    return dumps({"data": {"friends": {"nodes": nodes}, "currentFest": None}})
+
+
+def fullDecode(text: str) -> list[dict]:
+    """ The decode before streaming: parse everything, then stop at the first idle friend. """
+    playing = []
+    for node in loads(text)["data"]["friends"]["nodes"]:
+        if node["onlineState"] in IDLE_STATES:
+            break
+        playing.append(node)
+    return playing
+
+
+def streamDecode(text: str) -> list[dict]:
+    """ The decode FriendListQuery uses: stop decoding at the first idle friend. """
+    playing = []
+    for node, _ in iterArray(text, STREAM_PATH):
+        if node["onlineState"] in IDLE_STATES:
+            break
+        playing.append(node)
+    return playing
+
+
+def measure(decode, text: str) -> tuple[float, float]:
+    """ Returns the median milliseconds and the peak KiB allocated by a decode. """
+    times = []
+    for _ in range(REPEATS):
+        begin = perf_counter()
+        decode(text)
+        times.append(perf_counter() - begin)
+
+    start()
+    reset_peak()
+    decode(text)
+    _, peak = get_traced_memory()
+    stop()
+
+    return median(times) * 1000, peak / 1024
+
+
+def main():
+    rng = Random(0)
+    print(f"{'Friends':>8}{'Playing':>9}{'Size':>10}  {'loads':>20}  {'stream':>20}")
+
+    for friends in FRIEND_COUNTS:
+        for ratio in PLAYING_RATIOS:
+            playing = int(friends * ratio)
+            text = buildPayload(rng, friends, playing)
+            assert fullDecode(text) == streamDecode(text)
+
+            fullTime, fullPeak = measure(fullDecode, text)
+            streamTime, streamPeak = measure(streamDecode, text)
+            print(
+                f"{friends:>8}{playing:>9}{len(text) / 1024:>8.0f}KiB  "
+                f"{fullTime:>7.2f}ms {fullPeak:>7.0f}KiB  {streamTime:>7.2f}ms {streamPeak:>7.0f}KiB"
+            )
+
+
+if __name__ == "__main__":
+    main()
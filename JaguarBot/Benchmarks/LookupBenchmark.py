@@ -0,0 +1,102 @@
+""" Times the hot FindAbstractor lookups at 100k Users, before and after the schema migration.
+
+    Run from the 'Source' folder: python ../Benchmarks/LookupBenchmark.py """
+
+import sys
+from asyncio import run
+from os import path
+from random import Random
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+sys.path.insert(0, path.join(path.dirname(path.abspath(__file__)), "..", "Source"))
+
+from sqlalchemy import insert, select, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from Database.Models import Base, User, Token, GraphQLQuery, TokenType
+from Database.Engine import createSessionFactory
+from Database.Ext import FindAbstractor
+from Database.Migrations import MIGRATIONS, migrateSchema
+
+
+USERS    = 100_000
+QUERIES  = 500
+LOOKUPS  = 200
+BATCH    = 10_000
+
+INDEXES = ["ix_user_discord_id", "ix_token_user_type", "ix_app_version_name", "ix_graph_ql_query_name"]
+
+
+async def seed(engine) -> None:
+    """ Create the pre-migration schema and fill it with synthetic Users and tokens. """
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        for index in INDEXES:
+            await conn.execute(text(f"DROP INDEX {index}"))
+        await conn.execute(text("PRAGMA user_version = 0"))
+
+        for start in range(0, USERS, BATCH):
+            userIDs = range(start + 1, min(start + BATCH, USERS) + 1)
+            await conn.execute(insert(User), [
+                {"id": userID, "discordID": 10**17 + userID, "language": "en-US", "country": "US"}
+                for userID in userIDs
+            ])
+            await conn.execute(insert(Token), [
+                {"userID": userID, "type": int(tokenType), "value": "x" * 64, "expiresAt": 2**31 - 1}
+                for userID in userIDs for tokenType in TokenType
+            ])
+
+        await conn.execute(insert(GraphQLQuery), [
+            {"name": f"Query{i}", "hash": f"{i:032x}"} for i in range(QUERIES)
+        ])
+
+
+async def timeLookups(dbSessions, discordIDs: list[int], queryNames: list[str]) -> tuple[float, float]:
+    """ Returns the mean milliseconds of `getTokenSetFromDID` and of a GraphQL hash lookup by its indexed name. """
+    async with dbSessions() as session:
+        fAbs = FindAbstractor(session)
+
+        start = perf_counter()
+        for discordID in discordIDs:
+            assert await fAbs.getTokenSetFromDID(discordID) is not None
+        tokenSetTime = (perf_counter() - start) / len(discordIDs)
+
+        start = perf_counter()
+        for name in queryNames:
+            (await session.scalars(select(GraphQLQuery.hash).where(GraphQLQuery.name == name))).one()
+        hashTime = (perf_counter() - start) / len(queryNames)
+
+    return tokenSetTime * 1000, hashTime * 1000
+
+
+async def main():
+    rng = Random(0)
+    # Distinct IDs for each run, so the TokenSetCache never answers.
+    discordIDs = [10**17 + userID for userID in rng.sample(range(1, USERS + 1), LOOKUPS * 2)]
+    queryNames = [f"Query{rng.randrange(QUERIES)}" for _ in range(LOOKUPS)]
+
+    with TemporaryDirectory() as tempDir:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path.join(tempDir, 'Benchmark.sqlite')}")
+        dbSessions = createSessionFactory(engine)
+
+        start = perf_counter()
+        await seed(engine)
+        print(f"Seeded {USERS} Users in {perf_counter() - start:.1f}s")
+
+        before = await timeLookups(dbSessions, discordIDs[:LOOKUPS], queryNames)
+
+        start = perf_counter()
+        await migrateSchema(engine)
+        print(f"Migrated to version {len(MIGRATIONS)} in {perf_counter() - start:.1f}s")
+
+        after = await timeLookups(dbSessions, discordIDs[LOOKUPS:], queryNames)
+        await engine.dispose()
+
+    print(f"{'Lookup':<22}{'Before':>12}{'After':>12}")
+    print(f"{'getTokenSetFromDID':<22}{before[0]:>10.3f}ms{after[0]:>10.3f}ms")
+    print(f"{'GraphQL hash by name':<22}{before[1]:>10.3f}ms{after[1]:>10.3f}ms")
+
+
+if __name__ == "__main__":
+    run(main())
@@ -0,0 +1,60 @@
+""" Times the /s3 stats win rate computation for a User with 10k stored battles.
+
+    Run from the 'Source' folder: python ../Benchmarks/StatsBenchmark.py """
+
+import sys
+from os import path
+from random import Random
+from statistics import median
+from time import perf_counter, time
+
+sys.path.insert(0, path.join(path.dirname(path.abspath(__file__)), "..", "Source"))
+
+from Database.Models import BattleMode, BattleRule, Judgement
+from Database.BattleStats import BattleStats
+
+
+BATTLES = 10_000
+REPEATS = 50
+STAGES  = 24
+WEAPONS = 130
+
+
+def buildRows(rng: Random) -> list[tuple]:
+    """ Return (playedAt, mode, rule, stage, weapon, judgement) rows, oldest first, as BattleStats loads them. """
+    start = int(time()) - BATTLES * 300
+    return [
+        (
+            start + i * 300,
+            int(rng.choice(list(BattleMode))),
+            int(rng.choice(list(BattleRule))),
+            rng.randrange(1, STAGES + 1),
+            rng.randrange(1, WEAPONS + 1),
+            int(rng.choices([Judgement.WIN, Judgement.LOSE, Judgement.DRAW, Judgement.DEEMED_LOSE], [48, 48, 2, 2])[0])
+        )
+        for i in range(BATTLES)
+    ]
+
+
+def main():
+    rows = buildRows(Random(0))
+    summarize = BattleStats._BattleStats__summarize
+
+    # The first call also pays for importing NumPy.
+    begin = perf_counter()
+    summary = summarize(rows)
+    firstTime = perf_counter() - begin
+
+    times = []
+    for _ in range(REPEATS):
+        begin = perf_counter()
+        summarize(rows)
+        times.append(perf_counter() - begin)
+
+    print(f"{BATTLES} battles, {summary.overall.games} decided, {len(summary.byWeapon)} weapons")
+    print(f"First call (with NumPy import): {firstTime * 1000:.1f}ms")
+    print(f"Median of {REPEATS} calls:        {median(times) * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
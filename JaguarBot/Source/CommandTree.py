@@ -1,12 +1,10 @@
-from Commands.NSO.Login import Login
+from importlib import import_module
 
-from Commands.Debug.Ping import Ping
-from Commands.Debug.Status import Status
-from Commands.Debug.RefreshVolatileTokens import RefreshVolatileTokens
-from Commands.Debug.ShowToken import ShowToken
+from Commands.Interfaces.ICommand import ICommand
 
-from Commands.SplatNet3.OnlineFriends import OnlineFriends
 
+# Commands are referenced as "Module.Path:ClassName" and only imported when registered,
+# so importing the tree itself stays cheap.
 
 # Define commands independent of a group.
 INDEPENDENT = []
@@ -16,16 +14,37 @@ GROUPS = {
     "debug": {
         "description": "Diagnose issues with the bot.",
         "guilds": [920851074116636692, 443128138331979776],
-        "commands": [Ping, Status, RefreshVolatileTokens, ShowToken]
+        "commands": [
+            "Commands.Debug.Ping:Ping",
+            "Commands.Debug.Status:Status",
+            "Commands.Debug.RefreshVolatileTokens:RefreshVolatileTokens",
+            "Commands.Debug.ShowToken:ShowToken",
+            "Commands.Debug.RefreshQueue:RefreshQueue",
+            "Commands.Debug.SyncCommands:SyncCommands"
+        ]
     },
     "nso": {
         "description": "Manage NSO Authentication.",
         "guilds": [920851074116636692, 443128138331979776],
-        "commands": [Login]
+        "commands": [
+            "Commands.NSO.Login:Login"
+        ]
     },
     "s3": {
         "description": "Interact with SplatNet3",
         "guilds": [920851074116636692, 443128138331979776],
-        "commands": [OnlineFriends]
+        "commands": [
+            "Commands.SplatNet3.OnlineFriends:OnlineFriends",
+            "Commands.SplatNet3.GuildPlaying:GuildPlaying",
+            "Commands.SplatNet3.PresenceAlerts:PresenceAlerts",
+            "Commands.SplatNet3.Stats:Stats",
+            "Commands.SplatNet3.Schedule:Schedule"
+        ]
     }
 }
+
+
+def loadCommand(path: str) -> type[ICommand]:
+    """ Import a command class from its "Module.Path:ClassName" reference. """
+    moduleName, className = path.split(":")
+    return getattr(import_module(moduleName), className)
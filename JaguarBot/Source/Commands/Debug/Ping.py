@@ -1,12 +1,12 @@
 from discord import Bot, ApplicationContext, SlashCommandGroup
-from sqlalchemy import Engine
 from Commands.Interfaces.ICommand import ICommand
+from Database.Engine import SessionFactory
 
 class Ping(ICommand):
     """ Test the bot latency. """
 
     @staticmethod
-    def register(botInst: Bot, db: Engine, group: SlashCommandGroup|None = None) -> None:
+    def register(botInst: Bot, db: SessionFactory, group: SlashCommandGroup|None = None) -> None:
         regGroup = group if group is not None else botInst
         
         @regGroup.command(description=__class__.__doc__)
@@ -15,5 +15,5 @@ class Ping(ICommand):
 
 
     @staticmethod
-    async def run(ctx: ApplicationContext, bot: Bot, dbEngine: Engine):
+    async def run(ctx: ApplicationContext, bot: Bot, dbSessions: SessionFactory):
         await ctx.respond(f"Running at {round(bot.latency*1000)}ms")
\ No newline at end of file
@@ -0,0 +1,42 @@
+from discord import Bot, ApplicationContext, SlashCommandGroup
+from discord import Embed, Colour, EmbedField
+
+from Commands.Interfaces.ICommand import ICommand
+from Database.Engine import SessionFactory
+from NSOAuth.RefreshScheduler import RefreshScheduler
+from Config import INFO_EMBED_COLOR
+
+class RefreshQueue(ICommand):
+    """ Show the proactive token refresh queue. """
+
+    SHOWN_DEADLINES = 10
+
+    @staticmethod
+    def register(botInst: Bot, db: SessionFactory, group: SlashCommandGroup|None = None) -> None:
+        regGroup = group if group is not None else botInst
+
+        @regGroup.command(description=__class__.__doc__)
+        async def refresh_queue(ctx: ApplicationContext):
+            await __class__.run(ctx, botInst, db)
+
+
+    @staticmethod
+    async def run(ctx: ApplicationContext, bot: Bot, dbSessions: SessionFactory):
+        upcoming = RefreshScheduler.nextRefreshes(__class__.SHOWN_DEADLINES)
+
+        deadlineLines = [
+            f"<t:{int(entry.deadline)}:R> User {entry.userID} ({entry.tokenType.name})"
+            for entry in upcoming
+        ]
+
+        outEmbed = Embed(
+            title="**Token Refresh Queue**",
+            color=Colour.from_rgb(*INFO_EMBED_COLOR),
+            fields=[
+                EmbedField("Queued", f"```{RefreshScheduler.queueDepth()}```", inline=True),
+                EmbedField("Running", f"```{RefreshScheduler.runningCount()}```", inline=True),
+                EmbedField("Next Deadlines", "\n".join(deadlineLines) if deadlineLines else "Nothing queued.")
+            ]
+        )
+
+        await ctx.respond(embed=outEmbed, ephemeral=True)
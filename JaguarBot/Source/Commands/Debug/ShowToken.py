@@ -1,19 +1,18 @@
 from discord import Bot, ApplicationContext, SlashCommandGroup, Option
 from discord import Embed, EmbedField, Colour
-from sqlalchemy import Engine
-from sqlalchemy.orm import Session
 from time import time
 
 from Commands.Interfaces.ICommand import ICommand
 from Database.Models import TokenType
 from Database.Ext import FindAbstractor
+from Database.Engine import SessionFactory
 from Config import INFO_EMBED_COLOR
 
 class ShowToken(ICommand):
     """ Display a token. """
 
     @staticmethod
-    def register(botInst: Bot, db: Engine, group: SlashCommandGroup|None = None) -> None:
+    def register(botInst: Bot, db: SessionFactory, group: SlashCommandGroup|None = None) -> None:
         regGroup = group if group is not None else botInst
 
         tokenTypeType = Option(str, choices=['Session', 'GameWeb', 'Bullet'])
@@ -24,12 +23,11 @@ class ShowToken(ICommand):
 
 
     @staticmethod
-    async def run(ctx: ApplicationContext, bot: Bot, dbEngine: Engine, tokenType: str):      
-        with Session(dbEngine) as session:
-            fAbs = FindAbstractor(session)
-            userObj = fAbs.getUserFromDID(ctx.author.id)
+    async def run(ctx: ApplicationContext, bot: Bot, dbSessions: SessionFactory, tokenType: str):      
+        async with dbSessions() as session:
+            tokenSet = await FindAbstractor(session).getTokenSetFromDID(ctx.author.id)
 
-            if userObj == None:
+            if tokenSet == None:
                 await ctx.respond("You have not authenticated with your Nintendo account. Use `/login` to log in.")
                 return 
             
@@ -44,7 +42,7 @@ class ShowToken(ICommand):
                     await ctx.respond("Invalid token type specified.")
                     return
             
-            rToken = fAbs.getToken(userObj, tkType)
+            rToken = tokenSet.getToken(tkType)
             timeRemaining = int(rToken.expiresAt - time())
                 
             outEmbed = Embed(
@@ -1,9 +1,12 @@
 from discord import Bot, ApplicationContext, SlashCommandGroup
 from discord import Embed, Colour, EmbedField
-from sqlalchemy import Engine
-from sqlalchemy.orm import Session
+from sqlalchemy import select, func
 
-from Database.Models import User, Token, AppVersion, GraphQLQuery
+from Database.Models import User, Token, AppVersion, GraphQLQuery, Battle
+from Database.Engine import SessionFactory
+from Database.Cache import TokenSetCache
+from NSOAuth.GraphQL.ResponseCache import GQLResponseCache
+from NSOAuth.FAPIClient import FAPIClient
 from Commands.Interfaces.ICommand import ICommand
 
 
@@ -11,7 +14,7 @@ class Status(ICommand):
     """ Request the database and network status of the bot. """
 
     @staticmethod
-    def register(botInst: Bot, db: Engine, group: SlashCommandGroup|None = None) -> None:
+    def register(botInst: Bot, db: SessionFactory, group: SlashCommandGroup|None = None) -> None:
         regGroup = group if group is not None else botInst
         
         @regGroup.command(description=__class__.__doc__)
@@ -20,16 +23,40 @@ class Status(ICommand):
 
 
     @staticmethod
-    async def run(ctx: ApplicationContext, bot: Bot, dbEngine: Engine):
-        with Session(dbEngine) as session:
+    async def run(ctx: ApplicationContext, bot: Bot, dbSessions: SessionFactory):
+        async with dbSessions() as session:
 
-            dbObjects = [User, Token, AppVersion, GraphQLQuery]
+            dbObjects = [User, Token, AppVersion, GraphQLQuery, Battle]
 
             fieldList = []
             fieldList.append(EmbedField("Latency", f"```Running at {round(bot.latency*1000)}ms```"))
 
             for object in dbObjects:
-                fieldList.append(EmbedField(f"{object.__name__} Rows", f"```{len(session.query(object).all())}```", inline=True))
+                rowCount = await session.scalar(select(func.count()).select_from(object))
+                fieldList.append(EmbedField(f"{object.__name__} Rows", f"```{rowCount}```", inline=True))
+
+            cacheLookups = TokenSetCache.hits + TokenSetCache.misses
+            cacheHitRate = TokenSetCache.hits / cacheLookups if cacheLookups else 0
+            fieldList.append(EmbedField(
+                "TokenSet Cache",
+                f"```{TokenSetCache.size()} entries, {TokenSetCache.hits} hits / {TokenSetCache.misses} misses ({cacheHitRate:.0%})```"
+            ))
+
+            gqlHits = GQLResponseCache.hits + GQLResponseCache.staleHits
+            gqlLookups = gqlHits + GQLResponseCache.misses
+            gqlHitRate = gqlHits / gqlLookups if gqlLookups else 0
+            fieldList.append(EmbedField(
+                "GraphQL Cache",
+                f"```{GQLResponseCache.size()} entries ({GQLResponseCache.totalSize() / 1024:.0f} KiB), "
+                f"{GQLResponseCache.hits} hits + {GQLResponseCache.staleHits} stale / {GQLResponseCache.misses} misses ({gqlHitRate:.0%})```"
+            ))
+
+            fieldList.append(EmbedField("f-API Providers", "```" + "\n".join(
+                f"{provider.url}: {provider.successes}/{provider.requests} ok, {provider.failures} failed, "
+                f"{provider.hedgeWins}/{provider.hedges} hedges won, "
+                + (f"{provider.ewmaLatency * 1000:.0f}ms" if provider.ewmaLatency is not None else "no latency yet")
+                for provider in FAPIClient.default().providers
+            ) + "```"))
 
             outEmbed = Embed(
                 title="**Bot Status:** Jaguar.ink",
@@ -0,0 +1,29 @@
+from discord import Bot, ApplicationContext, SlashCommandGroup
+
+from Commands.Interfaces.ICommand import ICommand
+from Database.Engine import SessionFactory
+from Helpers.CommandSync import CommandSync
+
+class SyncCommands(ICommand):
+    """ Force a full resync of the application commands with Discord. """
+
+    @staticmethod
+    def register(botInst: Bot, db: SessionFactory, group: SlashCommandGroup|None = None) -> None:
+        regGroup = group if group is not None else botInst
+
+        @regGroup.command(description=__class__.__doc__)
+        async def sync_commands(ctx: ApplicationContext):
+            await __class__.run(ctx, botInst, db)
+
+
+    @staticmethod
+    async def run(ctx: ApplicationContext, bot: Bot, dbSessions: SessionFactory):
+        await ctx.defer(ephemeral=True)
+
+        try:
+            await CommandSync.forceSync(bot, dbSessions)
+        except Exception as e:
+            await ctx.respond(f"Failed to sync the commands: `{e}`", ephemeral=True)
+            return
+
+        await ctx.respond(f"Synced {len(bot.pending_application_commands)} commands.", ephemeral=True)
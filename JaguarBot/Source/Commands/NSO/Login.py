@@ -1,26 +1,25 @@
 from discord import Bot, ApplicationContext, SlashCommandGroup
-from sqlalchemy import Engine
-from sqlalchemy.orm import Session
 from discord.channel import DMChannel
 from discord import Message, Member, User
 from functools import partial
 from asyncio import TimeoutError
-from time import time
 
 from Commands.Interfaces.ICommand import ICommand
 from NSOAuth.TokenManager import TokenManager, Status, TKError
-from NSOAuth.VersionManager import VersionManager
+from NSOAuth.RefreshScheduler import RefreshScheduler
 from Database.Models import User as dbUser
 from Database.Models import Token, TokenType
+from Database.Ext import FindAbstractor
+from Database.Cache import TokenSetCache
+from Database.Engine import SessionFactory
 from NSOAuth.TokenManager import *
 from Helpers.Logger import Logger
-from Config import EXP_OFFSET
 
 class Login(ICommand):
     """ Login to provide access to NSO services. """
 
     @staticmethod
-    def register(botInst: Bot, db: Engine, group: SlashCommandGroup|None = None) -> None:
+    def register(botInst: Bot, db: SessionFactory, group: SlashCommandGroup|None = None) -> None:
         regGroup = group if group is not None else botInst
         
         @regGroup.command(description=__class__.__doc__)
@@ -32,16 +31,15 @@ class Login(ICommand):
         return (type(msg.channel) == DMChannel) and (msg.author == author)
 
     @staticmethod
-    async def run(ctx: ApplicationContext, bot: Bot, dbEngine: Engine):
+    async def run(ctx: ApplicationContext, bot: Bot, dbSessions: SessionFactory):
 
         # Preliminary Checks ------
-        with Session(dbEngine) as dbSession:
-            instance = dbSession.query(dbUser).filter_by(discordID=ctx.author.id).first()
-            if instance:
-                await ctx.respond("You've already logged into a Nintendo Account. Use the `nso logout` command to change accounts.", ephemeral=True, delete_after=8)
-                return
-            
-            vInfo = VersionManager(dbSession).getAppVersions()
+        async with dbSessions() as dbSession:
+            instance = await FindAbstractor(dbSession).getUserFromDID(ctx.author.id)
+
+        if instance:
+            await ctx.respond("You've already logged into a Nintendo Account. Use the `nso logout` command to change accounts.", ephemeral=True, delete_after=8)
+            return
 
         if not ctx.author.can_send():
             await ctx.respond("You must have DM permissions enabled to log in.", ephemeral=True, delete_after=8)
@@ -52,7 +50,7 @@ class Login(ICommand):
         if type(ctx.channel) != DMChannel:
             await ctx.respond("Sent login URL to DMs!", ephemeral=True, delete_after=8)
         
-        tkManager = TokenManager(vInfo)
+        tkManager = TokenManager()
         authInfo = await tkManager.generateNSOLoginLink()
 
         loginMsg = await ctx.author.send(f"Please log in to your Nintendo Account using the following link: {authInfo.url}")
@@ -71,8 +69,6 @@ class Login(ICommand):
 
         sessionToken = await tkManager.generateSessionToken(urlResponse.content, authInfo)
 
-        sessionExp = int(time()) + EXP_OFFSET.SESSION
-
         if sessionToken.result.status != Status.OK:
             match(sessionToken.result.errorType):
                 case TKError.INVALID_URL:
@@ -85,37 +81,36 @@ class Login(ICommand):
                     await ctx.author.send("An unknown error occurred. Please try again later.")
                     return
         
-        userInfo = await tkManager.getNintendoUserInfo(sessionToken.value)
-        
         await loginMsg.edit(content="Attempting authentication with SplatNet3...")
 
-        gToken = await tkManager.generateGToken(sessionToken.value)
-        gTokenExp = int(time()) + EXP_OFFSET.GTOKEN
-        
-        if gToken.result.status != Status.OK:
-            await ctx.author.send(f"Something went wrong: {gToken.result.message}")
-            logger.warn(f"Failed to generate GameWeb Token for User {ctx.author.id}.")
-            return
-
-        bulletToken = await tkManager.generateBulletToken(sessionToken.value, gToken.value)
-        bulletTokenExp = int(time()) + EXP_OFFSET.BULLET
+        chain = await tkManager.runRefreshChain(sessionToken.value)
 
-        if bulletToken.result.status != Status.OK:
-            await ctx.author.send(f"Something went wrong: {bulletToken.result.message}")
-            logger.warn(f"Failed to generate Bullet Token for User {ctx.author.id}.")
+        if chain.result.status != Status.OK:
+            await ctx.author.send(f"Something went wrong: {chain.result.message}")
+            logger.warn(f"Failed to generate GameWeb and Bullet Tokens for User {ctx.author.id}.")
             return
 
+        userInfo       = chain.userInfo
+        sessionExp     = sessionToken.expiresAt
+        gTokenExp      = chain.gTokenExpiresAt
+        bulletTokenExp = chain.bulletTokenExpiresAt
+
 
         # Add New Info to DataBase ------
-        with Session(dbEngine) as dbSession:
+        async with dbSessions() as dbSession:
             newUser = dbUser(discordID=ctx.author.id, language=userInfo.language, country=userInfo.country)
 
             newSToken = Token(user=newUser, type=TokenType.SESSION,  value=sessionToken.value, expiresAt=sessionExp)
-            newGToken = Token(user=newUser, type=TokenType.GAME_WEB, value=gToken.value,       expiresAt=gTokenExp)
-            newBToken = Token(user=newUser, type=TokenType.BULLET,   value=bulletToken.value,  expiresAt=bulletTokenExp)
+            newGToken = Token(user=newUser, type=TokenType.GAME_WEB, value=chain.gToken,        expiresAt=gTokenExp)
+            newBToken = Token(user=newUser, type=TokenType.BULLET,   value=chain.bulletToken,   expiresAt=bulletTokenExp)
 
             dbSession.add_all([newUser, newSToken, newGToken, newBToken])
-            dbSession.commit()
+            await dbSession.commit()
+
+            TokenSetCache.invalidate(discordID=ctx.author.id)
+
+            RefreshScheduler.schedule(newUser.id, TokenType.GAME_WEB, gTokenExp)
+            RefreshScheduler.schedule(newUser.id, TokenType.BULLET,   bulletTokenExp)
 
         logger.log(f"Created new user credentials for User {ctx.author.id}.")
         await ctx.author.send("Successfully authenticated! You can now use SplatNet3 commands.")
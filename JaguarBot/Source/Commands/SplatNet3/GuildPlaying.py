@@ -0,0 +1,100 @@
+from discord import Bot, ApplicationContext, SlashCommandGroup, Guild
+from discord import Embed, Colour
+
+from Commands.Interfaces.ICommand import ICommand
+from Commands.SplatNet3.Render import friendField
+from Database.Ext import FindAbstractor
+from Database.Engine import SessionFactory
+from NSOAuth.GraphQL.FriendListQuery import FriendListQuery
+from NSOAuth.GraphQL.GQLExecutor import GQLExecutor
+from Config import INFO_EMBED_COLOR, MEMBERS_INTENT
+
+class GuildPlaying(ICommand):
+    """ Displays everyone playing Splatoon 3 on the friend lists of this server's members. """
+
+    LOOKUP_SIZE       = 500     # Members looked up per database query, below SQLite's variable limit.
+    MEMBER_QUERY_SIZE = 100     # Most members Discord returns per gateway query.
+
+    @staticmethod
+    def register(botInst: Bot, db: SessionFactory, group: SlashCommandGroup|None = None) -> None:
+        regGroup = group if group is not None else botInst
+
+        @regGroup.command(description=__class__.__doc__)
+        async def guild_playing(ctx: ApplicationContext):
+            await __class__.run(ctx, botInst, db)
+
+
+    @staticmethod
+    async def run(ctx: ApplicationContext, bot: Bot, dbSessions: SessionFactory):
+        if ctx.guild is None:
+            await ctx.respond("This command can only be used in a server.")
+            return
+
+        await ctx.defer()
+
+        memberIDs = await __class__.__getMemberIDs(ctx.guild, dbSessions)
+
+        tokenSets = {}
+        async with dbSessions() as session:
+            fAbs = FindAbstractor(session)
+            for i in range(0, len(memberIDs), __class__.LOOKUP_SIZE):
+                tokenSets.update(await fAbs.getTokenSetsFromDIDs(memberIDs[i:i + __class__.LOOKUP_SIZE]))
+
+        if not tokenSets:
+            await ctx.followup.send(content="Nobody in this server is logged in. Use `/login` to log in.")
+            return
+
+        queries = [FriendListQuery(dbSessions, tokens) for tokens in tokenSets.values()]
+        answered = await GQLExecutor.sendAll(queries)
+
+        if not answered:
+            await ctx.followup.send(content="Failed to get friends from the server.")
+            return
+
+        # The same player shows up once per member they are friends with.
+        players = {}
+        for query in answered:
+            for friend in query.getAllPlayingFriends():
+                players.setdefault(friend.id, friend)
+
+        if not players:
+            await ctx.followup.send(content="Nobody is currently playing.")
+            return
+
+        embedFields = [field for field in map(friendField, players.values()) if field is not None]
+
+        outputEmbed = Embed(
+            title  = f"Currently Playing: {len(players)}",
+            color  = Colour.from_rgb(*INFO_EMBED_COLOR),
+            fields = embedFields[0:FriendListQuery.MAX_PLAYERS]
+        )
+
+        outputEmbed.set_footer(
+            text=f"{min(len(embedFields), FriendListQuery.MAX_PLAYERS)} of {len(players)} displayed, "
+                 f"from {len(answered)} of {len(queries)} members."
+        )
+
+        await ctx.followup.send(embed=outputEmbed)
+
+
+    @staticmethod
+    async def __getMemberIDs(guild: Guild, dbSessions: SessionFactory) -> list[int]:
+        """ Internal helper that returns the Discord IDs of guild members that may be linked.
+
+            With the members intent, the guild's members are read from the member cache,
+            which is filled from the gateway the first time the guild is used. Without it,
+            the gateway is asked which linked Users are members, 100 at a time. """
+        if MEMBERS_INTENT:
+            if not guild.chunked:
+                await guild.chunk()
+            return [member.id for member in guild.members if not member.bot]
+
+        async with dbSessions() as session:
+            linkedIDs = await FindAbstractor(session).getLinkedDIDs()
+
+        memberIDs = []
+        for i in range(0, len(linkedIDs), __class__.MEMBER_QUERY_SIZE):
+            chunk = linkedIDs[i:i + __class__.MEMBER_QUERY_SIZE]
+            members = await guild.query_members(user_ids=chunk, limit=len(chunk), cache=False)
+            memberIDs.extend(member.id for member in members)
+        return memberIDs
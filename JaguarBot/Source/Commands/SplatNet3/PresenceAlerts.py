@@ -0,0 +1,44 @@
+from discord import Bot, ApplicationContext, SlashCommandGroup, Option
+from sqlalchemy import delete
+
+from Commands.Interfaces.ICommand import ICommand
+from Database.Models import PresenceSubscription
+from Database.Ext import FindAbstractor, getOrCreate
+from Database.Engine import SessionFactory
+from NSOAuth.PresenceWatcher import PresenceWatcher
+
+class PresenceAlerts(ICommand):
+    """ Get a direct message when one of your friends starts playing. """
+
+    @staticmethod
+    def register(botInst: Bot, db: SessionFactory, group: SlashCommandGroup|None = None) -> None:
+        regGroup = group if group is not None else botInst
+
+        enabledType = Option(bool, description="Turn the alerts on or off.")
+
+        @regGroup.command(description=__class__.__doc__)
+        async def presence_alerts(ctx: ApplicationContext, enabled: enabledType): #type: ignore
+            await __class__.run(ctx, botInst, db, enabled)
+
+
+    @staticmethod
+    async def run(ctx: ApplicationContext, bot: Bot, dbSessions: SessionFactory, enabled: bool):
+        async with dbSessions() as session:
+            user = await FindAbstractor(session).getUserFromDID(ctx.author.id)
+
+            if user == None:
+                await ctx.respond("Cannot use this command because you are not logged in. Use `/login` to log in.", ephemeral=True)
+                return
+
+            if enabled:
+                await getOrCreate(session, PresenceSubscription, userID=user.id)
+            else:
+                await session.execute(delete(PresenceSubscription).where(PresenceSubscription.userID == user.id))
+            await session.commit()
+
+        if enabled:
+            PresenceWatcher.subscribe(user.id)
+            await ctx.respond("You will get a direct message when your friends start playing.", ephemeral=True)
+        else:
+            PresenceWatcher.unsubscribe(user.id)
+            await ctx.respond("Presence alerts turned off.", ephemeral=True)
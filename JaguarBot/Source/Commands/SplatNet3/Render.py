@@ -0,0 +1,14 @@
+from discord import EmbedField
+
+from NSOAuth.GraphQL.Friend import Friend, FriendMode
+
+
+def friendField(friend: Friend) -> EmbedField|None:
+    """ Build the embed field describing what a friend is playing.
+        Returns None if they are not in a match. """
+    if friend.mode == FriendMode.NONE:
+        return None
+
+    nameStr = f"{friend.emoji} {friend.playerName} {':lock:' if friend.isLocked else ''}"
+
+    return EmbedField(nameStr, friend.label)
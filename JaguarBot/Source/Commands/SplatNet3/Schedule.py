@@ -0,0 +1,65 @@
+from discord import Bot, ApplicationContext, SlashCommandGroup
+from discord import Embed, Colour, EmbedField
+from time import time
+
+from Commands.Interfaces.ICommand import ICommand
+from Database.Engine import SessionFactory
+from NSOAuth.GraphQL.GlobalQuery import GlobalQuery
+from NSOAuth.GraphQL.ScheduleQuery import ScheduleQuery, Rotation
+from Config import INFO_EMBED_COLOR, DISCORD_EMOJI
+
+class Schedule(ICommand):
+    """ Displays the current and next Splatoon 3 stage rotations. """
+
+    SHOWN_ROTATIONS = 2
+
+    @staticmethod
+    def register(botInst: Bot, db: SessionFactory, group: SlashCommandGroup|None = None) -> None:
+        regGroup = group if group is not None else botInst
+
+        @regGroup.command(description=__class__.__doc__)
+        async def schedule(ctx: ApplicationContext):
+            await __class__.run(ctx, botInst, db)
+
+
+    @staticmethod
+    async def run(ctx: ApplicationContext, bot: Bot, dbSessions: SessionFactory):
+        await ctx.defer()
+
+        scheduleQuery = await GlobalQuery.send(dbSessions, ScheduleQuery)
+        if scheduleQuery is None:
+            await ctx.followup.send(content="Failed to get the schedules from the server.")
+            return
+
+        try:
+            schedules = [
+                (f"{DISCORD_EMOJI.TURF_WAR} Turf War",         scheduleQuery.getRegular()),
+                (f"{DISCORD_EMOJI.ANARCHY} Anarchy (Series)",  scheduleQuery.getAnarchy("CHALLENGE")),
+                (f"{DISCORD_EMOJI.ANARCHY} Anarchy (Open)",    scheduleQuery.getAnarchy("OPEN")),
+                (f"{DISCORD_EMOJI.X_BATTLE} X Battle",         scheduleQuery.getXBattle()),
+                (f"{DISCORD_EMOJI.SALMON_RUN} Salmon Run",     scheduleQuery.getSalmonRun())
+            ]
+        except (KeyError, TypeError, ValueError):
+            await ctx.followup.send(content="Failed to read the schedules from the server.")
+            return
+
+        now = time()
+        embedFields = []
+        for name, rotations in schedules:
+            upcoming = [rotation for rotation in rotations if rotation.endTime > now][0:__class__.SHOWN_ROTATIONS]
+            if upcoming:
+                embedFields.append(EmbedField(name, "\n".join(map(__class__.__format, upcoming))))
+
+        outputEmbed = Embed(
+            title  = "Stage Schedule",
+            color  = Colour.from_rgb(*INFO_EMBED_COLOR),
+            fields = embedFields
+        )
+
+        await ctx.followup.send(embed=outputEmbed)
+
+
+    @staticmethod
+    def __format(rotation: Rotation) -> str:
+        """ Internal helper describing a rotation and when it changes. """
+        return f"**{rotation.rule}**: {' / '.join(rotation.stages)} (until <t:{rotation.endTime}:t>)"
@@ -0,0 +1,100 @@
+from discord import Bot, ApplicationContext, SlashCommandGroup
+from discord import Embed, Colour, EmbedField
+from sqlalchemy import select
+
+from Commands.Interfaces.ICommand import ICommand
+from Database.Models import Stage, Weapon
+from Database.Ext import FindAbstractor
+from Database.Engine import SessionFactory
+from Database.BattleStats import BattleStats, WinRate
+from NSOAuth.BattleSync import BattleSync
+from Config import INFO_EMBED_COLOR
+
+class Stats(ICommand):
+    """ Displays your win rates from your stored battle history. """
+
+    TOP_ENTRIES = 5
+
+    PERIOD_NAMES = {
+        86400:  "Last 24 Hours",
+        604800: "Last 7 Days"
+    }
+
+    @staticmethod
+    def register(botInst: Bot, db: SessionFactory, group: SlashCommandGroup|None = None) -> None:
+        regGroup = group if group is not None else botInst
+
+        @regGroup.command(description=__class__.__doc__)
+        async def stats(ctx: ApplicationContext):
+            await __class__.run(ctx, botInst, db)
+
+
+    @staticmethod
+    async def run(ctx: ApplicationContext, bot: Bot, dbSessions: SessionFactory):
+        async with dbSessions() as session:
+            tokens = await FindAbstractor(session).getTokenSetFromDID(ctx.author.id)
+
+        if tokens == None:
+            await ctx.respond("Cannot use this command because you are not logged in. Use `/login` to log in.")
+            return
+
+        # Answer from the stored battles, new ones are picked up for the next call.
+        BattleSync.syncInBackground(dbSessions, tokens)
+
+        summary = await BattleStats.getSummary(dbSessions, tokens.userID, BattleSync.revision(tokens.userID))
+        if summary is None:
+            await ctx.respond("No battles stored yet, they are being downloaded. Try again in a minute.")
+            return
+
+        # Draws and unknown results are not counted, every breakdown would be empty.
+        if summary.overall.games == 0:
+            await ctx.respond("No decided battles stored yet, draws are not counted.")
+            return
+
+        topStages  = __class__.__top(summary.byStage)
+        topWeapons = __class__.__top(summary.byWeapon)
+
+        async with dbSessions() as session:
+            stageNames  = dict((await session.execute(select(Stage.id, Stage.name).where(Stage.id.in_(topStages)))).all())
+            weaponNames = dict((await session.execute(select(Weapon.id, Weapon.name).where(Weapon.id.in_(topWeapons)))).all())
+
+        fieldList = [
+            EmbedField("Overall", __class__.__format(summary.overall)),
+            EmbedField("Recent", "\n".join(
+                f"Last {count}: {__class__.__format(winRate)}" for count, winRate in summary.recent.items()
+            ), inline=True),
+            EmbedField("Periods", "\n".join(
+                f"{__class__.PERIOD_NAMES.get(seconds, f'{seconds}s')}: {__class__.__format(winRate)}"
+                for seconds, winRate in summary.periods.items()
+            ), inline=True),
+            EmbedField("Modes", "\n".join(
+                f"{mode.name.replace('_', ' ').title()}: {__class__.__format(winRate)}"
+                for mode, winRate in summary.byMode.items()
+            )),
+            EmbedField("Top Stages", "\n".join(
+                f"{stageNames.get(stageID, stageID)}: {__class__.__format(summary.byStage[stageID])}" for stageID in topStages
+            ), inline=True),
+            EmbedField("Top Weapons", "\n".join(
+                f"{weaponNames.get(weaponID, weaponID)}: {__class__.__format(summary.byWeapon[weaponID])}" for weaponID in topWeapons
+            ), inline=True)
+        ]
+
+        outputEmbed = Embed(
+            title  = "Battle Stats",
+            color  = Colour.from_rgb(*INFO_EMBED_COLOR),
+            fields = [field for field in fieldList if field.value]
+        )
+
+        await ctx.respond(embed=outputEmbed)
+
+
+    @staticmethod
+    def __top(groups: dict[int, WinRate]) -> list[int]:
+        """ Internal helper returning the most played keys. """
+        return sorted(groups, key=lambda key: groups[key].games, reverse=True)[0:__class__.TOP_ENTRIES]
+
+
+    @staticmethod
+    def __format(winRate: WinRate) -> str:
+        """ Internal helper that formats a win rate with its game count. """
+        return f"{winRate.rate:.0%} ({winRate.wins}/{winRate.games})"
@@ -2,16 +2,98 @@
 SERVER_NAME    = "NSlashO"
 SERVER_VERSION = "0.0.1"
 
+# Privileged, must also be enabled for the application in the Discord Developer Portal.
+# When off, /s3 guild_playing asks the gateway which linked Users are in the guild instead.
+MEMBERS_INTENT = False
+
 DATABASE_PATH = "Database"
 DATABASE_NAME = "UserDB.sqlite"
+DATABASE_LOCK_TIMEOUT = 30
+
+class F_API:
+    # Asked in order of health and latency, see NSOAuth/FAPIClient.py.
+    PROVIDERS = [
+        "https://api.imink.app/f",
+        "https://nxapi-znca-api.fancy.org.uk/api/znca/f"
+    ]
+    HEDGE               = True
+    HEDGE_DEFAULT_DELAY = 2.0   # Seconds before hedging while a provider has too few samples.
+    HEDGE_MIN_DELAY     = 0.5
+    HEDGE_MIN_SAMPLES   = 20
+    LATENCY_SAMPLES     = 100   # Recent latencies kept per provider for the p95.
+    EWMA_ALPHA          = 0.2
+    MAX_FAILURES        = 3     # Failures in a row before a provider is benched.
+    FAILURE_COOLDOWN    = 60
 
-F_ENDPOINT = "https://api.imink.app/f"
+VERSION_REFRESH_INTERVAL = 21600
 
 class EXP_OFFSET:
     SESSION = 63072000
     GTOKEN  = 21600
     BULLET  = 7000
 
+class REFRESH:
+    LEAD_TIME   = 300   # Seconds before expiry to refresh a token.
+    JITTER      = 60    # Maximum random seconds subtracted from each deadline.
+    CONCURRENCY = 4
+    RETRY_DELAY = 120   # Doubled after each failure in a row, up to MAX_RETRY_DELAY.
+    MAX_RETRY_DELAY = 21600
+
+class NIN_USER_CACHE:
+    TTL           = 600    # Capped by the lifetime of the cached ID/Access tokens.
+    EXPIRY_MARGIN = 60
+    MAX_ENTRIES   = 1000
+
+class CACHE:
+    TOKEN_SET_ENTRIES    = 5000
+    BATTLE_STATS_ENTRIES = 500
+
+class GQL_CACHE:
+    MAX_BYTES = 16 * 1024 * 1024   # Budget for the raw size of every cached GraphQL response.
+
+class HTTP:
+    TIMEOUT                  = 15
+    MAX_CONNECTIONS          = 100
+    MAX_CONNECTIONS_PER_HOST = 10
+    KEEPALIVE_TIMEOUT        = 60
+    DNS_CACHE_TTL            = 300
+
+    # Per-host overrides of the values above.
+    HOST_LIMITS = {
+        "api.imink.app": 4,
+        "nxapi-znca-api.fancy.org.uk": 4
+    }
+    HOST_TIMEOUTS = {
+        "api.imink.app": 10,
+        "nxapi-znca-api.fancy.org.uk": 10
+    }
+    # Requests per second, hosts missing here are not rate limited.
+    HOST_RATES = {
+        "api.lp1.av5ja.srv.nintendo.net": 20
+    }
+
+class FAN_OUT:
+    CONCURRENCY = 16    # Requests run at once across every fan-out.
+    DEADLINE    = 10    # Seconds before returning whatever has finished.
+
+class PRESENCE:
+    ACTIVE_INTERVAL = 60     # Seconds between polls while a friend is playing.
+    IDLE_INTERVAL   = 300    # Seconds between polls while nobody is playing.
+    MAX_BACKOFF     = 3600   # Longest wait after repeated upstream errors.
+    RENOTIFY_AFTER  = 1800   # Seconds a friend must stop playing before the same mode is announced again.
+    WORKERS         = 8
+
+class BATTLE_SYNC:
+    INTERVAL    = 3600   # SplatNet3 only lists the latest 50 battles.
+    CONCURRENCY = 4      # Battle details fetched at once per User.
+    USERS       = 2      # Users synced at once by the background loop.
+
+class GLOBAL_QUERY:
+    ROTATION_DELAY     = 30     # Seconds after a rotation before SplatNet3 is asked for the new one.
+    UNHEALTHY_COOLDOWN = 600    # Seconds a User is skipped after their request failed.
+    MIN_VALIDITY       = 300    # Seconds a Bullet Token must stay valid for its User to be picked.
+    MAX_ATTEMPTS       = 3
+
 # CUSTOMIZATION ----------
 INFO_EMBED_COLOR = (0, 255, 255)
 
@@ -1,53 +1,131 @@
+from time import perf_counter
+IMPORT_START = perf_counter()
+
 import discord
+from asyncio import run
 from os import environ
-from sqlalchemy import create_engine
-from sqlalchemy.orm import Session
 
-import Config
 import CommandTree
+import Config
 from Helpers.Logger import Logger
+from Helpers.Timeline import Timeline
+from Helpers.HTTPClient import HTTPClient
+from Helpers.CommandSync import CommandSync
 from NSOAuth.VersionManager import VersionManager
 from Database.Models import Base
+from Database.Engine import createEngine, createSessionFactory
+from Database.Migrations import migrateSchema
+
+
+async def main():
+
+    timeline = Timeline("Startup", IMPORT_START)
+    timeline.mark("Imports")
 
+    engine = createEngine()
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    await migrateSchema(engine)
 
-def main():
+    dbSessions = createSessionFactory(engine)
 
-    # Depends on CWD, run from 'Source' folder.
-    engine = create_engine(f"sqlite:///{Config.DATABASE_PATH}/{Config.DATABASE_NAME}")
-    Base.metadata.create_all(engine)
-    
     logger = Logger("Core")
-    bot = discord.Bot()
+    # With the members intent, members are cached per guild on first use by /s3 guild_playing.
+    intents = discord.Intents.default()
+    intents.members = Config.MEMBERS_INTENT
 
-    with Session(engine) as session:
-        logger.log("Attempting to get application newest versions...")
-        if VersionManager(session).updateVersions():
-            logger.log("Got the latest versions!")
-        else:
+    # Commands are synced by CommandSync, only when the tree changed.
+    bot = discord.Bot(intents=intents, chunk_guilds_at_startup=False, auto_sync_commands=False)
+
+    # Start from the last known versions, they are refreshed once connected.
+    registry = await VersionManager(dbSessions).loadRegistry()
+    if not registry.isComplete():
+        logger.log("Missing stored application versions or queries, fetching them before connecting...")
+        if not await VersionManager(dbSessions).updateVersions():
             logger.warn("Failed to get the latest versions.")
-   
-    for command in CommandTree.INDEPENDENT:
-        command.register(bot, engine)
-    
-    for group in CommandTree.GROUPS:
-        currGroup = CommandTree.GROUPS[group]
-        slashGroup = bot.create_group(
-            group,
-            currGroup["description"],
-            currGroup["guilds"]
-        )
-        for command in currGroup["commands"]:
-            command.register(bot, engine, slashGroup)
 
+    timeline.mark("Database init")
+
+    def registerCommands():
+        for command in CommandTree.INDEPENDENT:
+            CommandTree.loadCommand(command).register(bot, dbSessions)
+
+        for group in CommandTree.GROUPS:
+            currGroup = CommandTree.GROUPS[group]
+            slashGroup = bot.create_group(
+                group,
+                currGroup["description"],
+                currGroup["guilds"]
+            )
+            for command in currGroup["commands"]:
+                CommandTree.loadCommand(command).register(bot, dbSessions, slashGroup)
+
+
+    registered = False
+
+    @bot.event
+    async def on_connect():
+        nonlocal registered
+
+        # Command modules are only imported once the login is underway, before the first sync.
+        if not registered:
+            registered = True
+            registerCommands()
+            timeline.mark("Command registration")
+
+        try:
+            await CommandSync.syncIfChanged(bot, dbSessions)
+        except Exception as e:
+            logger.warn(f"Failed to sync the application commands: {e}")
+
+
+    started = False
+    # Stops the background work that was started, in reverse order on shutdown.
+    stopCallbacks = []
 
     @bot.event
     async def on_ready():
+        nonlocal started
         logger.log(f"Connected to {bot.user}!")
 
+        # `on_ready` fires again after every reconnect, only start the background work once.
+        if started:
+            return
+        started = True
+
+        timeline.mark("Gateway ready")
+
+        # The background engines are only imported once connected.
+        from NSOAuth.RefreshScheduler import RefreshScheduler
+        from NSOAuth.PresenceWatcher import PresenceWatcher
+        from NSOAuth.BattleSync import BattleSync
+        from NSOAuth.GraphQL.ScheduleQuery import ScheduleQuery
+
+        VersionManager.startRefreshLoop(dbSessions)
+        stopCallbacks.append(VersionManager.stopRefreshLoop)
+        await RefreshScheduler.start(dbSessions)
+        stopCallbacks.append(RefreshScheduler.stop)
+        await PresenceWatcher.start(bot, dbSessions)
+        stopCallbacks.append(PresenceWatcher.stop)
+        BattleSync.startSyncLoop(dbSessions)
+        stopCallbacks.append(BattleSync.stopSyncLoop)
+        ScheduleQuery.startRotation(dbSessions)
+        stopCallbacks.append(ScheduleQuery.stopRotation)
+
+        timeline.mark("Background tasks")
+
 
     logger.log("Logging into Discord...")
-    bot.run(environ["DiscordBotToken"])
+    try:
+        await bot.start(environ["DiscordBotToken"])
+    finally:
+        for stop in reversed(stopCallbacks):
+            stop()
+        if not bot.is_closed():
+            await bot.close()
+        await HTTPClient.close()
+        await engine.dispose()
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    run(main())
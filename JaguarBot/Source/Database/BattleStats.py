@@ -0,0 +1,117 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from sqlalchemy import select, bindparam
+from time import time
+
+from Database.Models import Battle, BattleMode, BattleRule, Judgement
+from Database.Engine import SessionFactory
+from Config import CACHE
+
+
+@dataclass(frozen=True, slots=True)
+class WinRate:
+    games: int
+    wins: int
+
+    @property
+    def rate(self) -> float:
+        """ The share of games won, 0 when no games were played. """
+        return self.wins / self.games if self.games else 0
+
+
+@dataclass(frozen=True, slots=True)
+class BattleStatsSummary:
+    """ Win rates of a User's stored battles. Draws are not counted as games. """
+    overall: WinRate
+    recent: dict[int, WinRate]          # Keyed by the number of latest battles.
+    periods: dict[int, WinRate]         # Keyed by the number of seconds looked back.
+    byMode: dict[BattleMode, WinRate]
+    byRule: dict[BattleRule, WinRate]
+    byStage: dict[int, WinRate]         # Keyed by Stage ID.
+    byWeapon: dict[int, WinRate]        # Keyed by Weapon ID.
+
+
+class BattleStats:
+    """ Computes win rates from stored battles with NumPy, one array per column.
+
+        Summaries are memoized per User until BattleSync stores new battles for them. """
+
+    RECENT_BATTLES = (20, 50, 100)
+    PERIODS = (86400, 604800)
+
+    __COLUMNS = select(Battle.playedAt, Battle.mode, Battle.rule, Battle.stageID, Battle.weaponID, Battle.judgement) \
+                    .where(Battle.userID == bindparam("userID")).order_by(Battle.playedAt)
+
+    __summaries: OrderedDict[int, tuple[int, BattleStatsSummary]] = OrderedDict()
+
+
+    @staticmethod
+    async def getSummary(dbSessions: SessionFactory, userID: int, revision: int) -> BattleStatsSummary|None:
+        """ Return the User's stats, or None if they have no battles stored.
+            `revision` is the User's BattleSync revision, a different one recomputes the stats. """
+        memo = __class__.__summaries.get(userID)
+        if memo is not None and memo[0] == revision:
+            __class__.__summaries.move_to_end(userID)
+            return memo[1]
+
+        async with dbSessions() as session:
+            rows = (await session.execute(__class__.__COLUMNS, {"userID": userID})).all()
+
+        if not rows:
+            return None
+
+        summary = __class__.__summarize(rows)
+
+        __class__.__summaries[userID] = (revision, summary)
+        __class__.__summaries.move_to_end(userID)
+        while len(__class__.__summaries) > CACHE.BATTLE_STATS_ENTRIES:
+            __class__.__summaries.popitem(last=False)
+
+        return summary
+
+
+    @staticmethod
+    def __summarize(rows: list) -> BattleStatsSummary:
+        """ Internal helper that computes every win rate from (playedAt, mode, rule, stage, weapon, judgement) rows. """
+        import numpy as np
+
+        columns = np.array(rows, dtype=np.int64)
+        judgement = columns[:, 5]
+
+        # Only decided games count, so the remaining columns are filtered once here.
+        decided = (judgement != Judgement.DRAW) & (judgement != Judgement.UNKNOWN)
+        playedAt, mode, rule, stage, weapon = (columns[decided, i] for i in range(5))
+        wins = judgement[decided] == Judgement.WIN
+
+        # Prefix sums turn every "last N" window into two lookups.
+        winTotals = np.concatenate(([0], np.cumsum(wins)))
+        games = len(wins)
+
+        def window(start: int) -> WinRate:
+            return WinRate(games - start, int(winTotals[-1] - winTotals[start]))
+
+        now = time()
+        return BattleStatsSummary(
+            overall  = window(0),
+            recent   = {count: window(max(games - count, 0)) for count in __class__.RECENT_BATTLES},
+            periods  = {
+                seconds: window(int(np.searchsorted(playedAt, now - seconds)))
+                for seconds in __class__.PERIODS
+            },
+            byMode   = {BattleMode(key): value for key, value in __class__.__groupBy(mode, wins).items()},
+            byRule   = {BattleRule(key): value for key, value in __class__.__groupBy(rule, wins).items()},
+            byStage  = __class__.__groupBy(stage, wins),
+            byWeapon = __class__.__groupBy(weapon, wins)
+        )
+
+
+    @staticmethod
+    def __groupBy(keys, wins) -> dict[int, WinRate]:
+        """ Internal helper returning the win rate of every distinct key. """
+        import numpy as np
+
+        groups, inverse = np.unique(keys, return_inverse=True)
+        games = np.bincount(inverse, minlength=len(groups))
+        won = np.bincount(inverse, weights=wins, minlength=len(groups))
+
+        return {int(key): WinRate(int(g), int(w)) for key, g, w in zip(groups, games, won)}
@@ -0,0 +1,105 @@
+from collections import OrderedDict
+
+from Database.Models import TokenSet
+from Config import CACHE
+
+
+class TokenSetCache:
+    """ Bounded LRU cache of TokenSets keyed by Discord ID.
+
+        Anything that writes a User's tokens must call `invalidate` after committing.
+        Readers take a `generation` before querying and pass it to `put`, so a read
+        that raced an invalidation is not cached. """
+
+    __entries: OrderedDict[int, TokenSet] = OrderedDict()
+    __userToDID: dict[int, int] = {}
+
+    # Generation of the last invalidation per User ID and per Discord ID.
+    __generation: int = 0
+    __invalidatedByUserID: dict[int, int] = {}
+    __invalidatedByDID: dict[int, int] = {}
+
+    hits: int = 0
+    misses: int = 0
+
+
+    @staticmethod
+    def get(discordID: int, countMiss: bool = True) -> TokenSet|None:
+        """ Return the cached TokenSet for a Discord ID, if present.
+            Callers that don't know whether the ID has a User pass `countMiss=False`,
+            then `countMisses` for the Users they loaded. """
+        tokens = __class__.__entries.get(discordID)
+        if tokens is None:
+            if countMiss:
+                __class__.misses += 1
+            return None
+
+        __class__.__entries.move_to_end(discordID)
+        __class__.hits += 1
+        return tokens
+
+
+    @staticmethod
+    def getByUserID(userID: int) -> TokenSet|None:
+        """ Return the cached TokenSet for a User ID, if present. """
+        discordID = __class__.__userToDID.get(userID)
+        if discordID is None:
+            __class__.misses += 1
+            return None
+        return __class__.get(discordID)
+
+
+    @staticmethod
+    def generation() -> int:
+        """ Return the current generation, to be taken before reading TokenSets from the database. """
+        return __class__.__generation
+
+
+    @staticmethod
+    def countMisses(count: int) -> None:
+        """ Count lookups of existing Users that were not cached. """
+        __class__.misses += count
+
+
+    @staticmethod
+    def put(tokens: TokenSet, generation: int) -> None:
+        """ Store a TokenSet read at `generation`, evicting the least recently used entry when full.
+            Skipped if the User was invalidated since, as the TokenSet may be stale. """
+        if __class__.__invalidatedByUserID.get(tokens.userID, 0) > generation \
+            or __class__.__invalidatedByDID.get(tokens.discordID, 0) > generation:
+            return
+
+        entries = __class__.__entries
+
+        entries[tokens.discordID] = tokens
+        entries.move_to_end(tokens.discordID)
+        __class__.__userToDID[tokens.userID] = tokens.discordID
+
+        while len(entries) > CACHE.TOKEN_SET_ENTRIES:
+            _, evicted = entries.popitem(last=False)
+            __class__.__userToDID.pop(evicted.userID, None)
+
+
+    @staticmethod
+    def invalidate(userID: int|None = None, discordID: int|None = None) -> None:
+        """ Drop a User's cached TokenSet by User ID or Discord ID. """
+        __class__.__generation += 1
+        if userID is not None:
+            __class__.__invalidatedByUserID[userID] = __class__.__generation
+        if discordID is not None:
+            __class__.__invalidatedByDID[discordID] = __class__.__generation
+
+        if discordID is None:
+            discordID = __class__.__userToDID.get(userID)
+        if discordID is None:
+            return
+
+        evicted = __class__.__entries.pop(discordID, None)
+        if evicted is not None:
+            __class__.__userToDID.pop(evicted.userID, None)
+
+
+    @staticmethod
+    def size() -> int:
+        """ Return the number of cached entries. """
+        return len(__class__.__entries)
@@ -0,0 +1,36 @@
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+
+import Config
+
+
+# Commands, managers and requests receive this and open one AsyncSession per unit of work.
+SessionFactory = async_sessionmaker[AsyncSession]
+
+
+def createEngine() -> AsyncEngine:
+    """ Create the aiosqlite-backed engine for the configured database. """
+
+    # Depends on CWD, run from 'Source' folder.
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{Config.DATABASE_PATH}/{Config.DATABASE_NAME}",
+        connect_args={"timeout": Config.DATABASE_LOCK_TIMEOUT}
+    )
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def setPragmas(dbapiConnection, _):
+        # WAL lets concurrent interactions read while a refresh is writing.
+        cursor = dbapiConnection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+
+    return engine
+
+
+def createSessionFactory(engine: AsyncEngine) -> SessionFactory:
+    """ Create the session factory shared by the whole bot.
+
+        Objects stay readable after commit so they can be used once their
+        session has closed without issuing lazy loads. """
+    return async_sessionmaker(engine, expire_on_commit=False)
@@ -1,13 +1,13 @@
-from time import time
-from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy import select, bindparam
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from Database.Models import User, Token, GraphQLQuery, TokenType
+from Database.Models import User, Token, TokenType, TokenInfo, TokenSet
+from Database.Cache import TokenSetCache
 
 
-def getOrCreate(session, model, **kwargs):
+async def getOrCreate(session: AsyncSession, model, **kwargs):
     """ Find a given item in the database or create it. """
-    instance = session.query(model).filter_by(**kwargs).first()
+    instance = (await session.scalars(select(model).filter_by(**kwargs))).first()
     if instance:
         return instance
     else:
@@ -18,29 +18,123 @@ def getOrCreate(session, model, **kwargs):
 
 class FindAbstractor:
     """ Handles common queries. """
-    
-    def __init__(self, session: Session) -> None:
+
+    # Built once so repeated lookups reuse the same compiled statement.
+    __TOKEN_SET_COLUMNS = select(
+        User.id, User.discordID, User.language, User.country,
+        Token.type, Token.value, Token.expiresAt
+    ).join(Token, Token.userID == User.id)
+
+    __TOKEN_SETS_BY_USER_ID = __TOKEN_SET_COLUMNS.where(User.id.in_(bindparam("userIDs", expanding=True)))
+    __TOKEN_SETS_BY_DID     = __TOKEN_SET_COLUMNS.where(User.discordID.in_(bindparam("discordIDs", expanding=True)))
+    __USERS_BY_DID          = select(User).where(User.discordID.in_(bindparam("discordIDs", expanding=True)))
+
+    def __init__(self, session: AsyncSession) -> None:
         self.dbSession = session
 
-    def getToken(self, user: User, tokenType: TokenType) -> Token:
-        """ Given a User, find the corresponding token. """
-        stmt = select(Token).where(Token.userID == user.id).where(Token.type == tokenType)
-        return self.dbSession.scalars(stmt).one()
-    
-    def getUserFromDID(self, discordID: int) -> User|None:
+    async def getToken(self, user: User, tokenType: TokenType) -> Token:
+        """ Given a User, find the corresponding token.
+            Always re-reads the row, as refreshes may commit through another session. """
+        stmt = select(Token).where(Token.userID == user.id).where(Token.type == tokenType) \
+                            .execution_options(populate_existing=True)
+        return (await self.dbSession.scalars(stmt)).one()
+
+    async def getUserFromDID(self, discordID: int) -> User|None:
         """ Given a Discord ID, returns a User. """
         stmt = select(User).where(User.discordID == discordID)
         try:
-            return self.dbSession.scalars(stmt).one()
+            return (await self.dbSession.scalars(stmt)).one()
         except Exception:
             return None
-    
-    def getHashFromName(self, name: str) -> str:
-        """ Return the GraphQL Hash from a given Name. """
-        stmt = select(GraphQLQuery).where(GraphQLQuery.name == name)
-        return self.dbSession.scalars(stmt).one().hash
-    
+
+    async def getUsersFromDIDs(self, discordIDs: list[int]) -> dict[int, User]:
+        """ Given Discord IDs, returns the matching Users keyed by Discord ID. """
+        result = await self.dbSession.scalars(self.__USERS_BY_DID, {"discordIDs": list(discordIDs)})
+        return {user.discordID: user for user in result}
+
+    async def getTokenSet(self, userID: int) -> TokenSet:
+        """ Given a User ID, load their current tokens in a single query. """
+        return (await self.getTokenSets([userID]))[userID]
+
+    async def getTokenSetFromDID(self, discordID: int) -> TokenSet|None:
+        """ Given a Discord ID, load the User and their tokens in a single query.
+            Served from the TokenSetCache when possible. """
+        tokens = TokenSetCache.get(discordID)
+        if tokens is not None:
+            return tokens
+
+        generation = TokenSetCache.generation()
+        result = await self.dbSession.execute(self.__TOKEN_SETS_BY_DID, {"discordIDs": [discordID]})
+        tokens = next(iter(self.__buildTokenSets(result).values()), None)
+
+        if tokens is not None:
+            TokenSetCache.put(tokens, generation)
+        return tokens
+
+    async def getTokenSetsFromDIDs(self, discordIDs: list[int]) -> dict[int, TokenSet]:
+        """ Given Discord IDs, load every User's tokens keyed by Discord ID.
+            Users missing from the TokenSetCache are loaded in a single query.
+            IDs without a User, e.g. unlinked guild members, are not counted as cache misses. """
+        tokenSets = {}
+        missing = []
+        for discordID in discordIDs:
+            tokens = TokenSetCache.get(discordID, countMiss=False)
+            if tokens is not None:
+                tokenSets[discordID] = tokens
+            else:
+                missing.append(discordID)
+
+        if missing:
+            generation = TokenSetCache.generation()
+            result = await self.dbSession.execute(self.__TOKEN_SETS_BY_DID, {"discordIDs": missing})
+            loaded = self.__buildTokenSets(result).values()
+            TokenSetCache.countMisses(len(loaded))
+            for tokens in loaded:
+                TokenSetCache.put(tokens, generation)
+                tokenSets[tokens.discordID] = tokens
+
+        return tokenSets
+
+    async def getLinkedDIDs(self) -> list[int]:
+        """ Returns the Discord IDs of every User. """
+        return list(await self.dbSession.scalars(select(User.discordID)))
+
+    async def getTokenSets(self, userIDs: list[int]) -> dict[int, TokenSet]:
+        """ Given User IDs, load every User's tokens keyed by User ID.
+            Users missing from the TokenSetCache are loaded in a single query. """
+        tokenSets = {}
+        missing = []
+        for userID in userIDs:
+            tokens = TokenSetCache.getByUserID(userID)
+            if tokens is not None:
+                tokenSets[userID] = tokens
+            else:
+                missing.append(userID)
+
+        if missing:
+            generation = TokenSetCache.generation()
+            result = await self.dbSession.execute(self.__TOKEN_SETS_BY_USER_ID, {"userIDs": missing})
+            for userID, tokens in self.__buildTokenSets(result).items():
+                TokenSetCache.put(tokens, generation)
+                tokenSets[userID] = tokens
+
+        return tokenSets
+
     @staticmethod
-    def isTokenExpired(token: Token) -> bool:
-        """ Returns a bool if the token is expired or not. """
-        return token.expiresAt <= int(time())
+    def __buildTokenSets(rows) -> dict[int, TokenSet]:
+        """ Internal helper that groups (User, Token) rows into TokenSets keyed by User ID. """
+        users = {}
+        tokens = {}
+        for userID, discordID, language, country, tokenType, value, expiresAt in rows:
+            users[userID] = (discordID, language, country)
+            tokens.setdefault(userID, {})[tokenType] = TokenInfo(value, expiresAt)
+
+        return {
+            userID: TokenSet(
+                userID, *users[userID],
+                session=tokens[userID].get(TokenType.SESSION),
+                gameWeb=tokens[userID].get(TokenType.GAME_WEB),
+                bullet=tokens[userID].get(TokenType.BULLET)
+            )
+            for userID in users
+        }
@@ -0,0 +1,39 @@
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from Helpers.Logger import Logger
+
+
+# Each entry upgrades the schema by one version, tracked in SQLite's `PRAGMA user_version`.
+# New databases are created by `Base.metadata.create_all` with the current schema, so every
+# statement here must be safe to run against a database that is already up to date.
+MIGRATIONS = [
+    # 1: Unique indexes for the hot lookup columns. Duplicate rows are removed first,
+    #    keeping the most recently inserted one.
+    [
+        "DELETE FROM token_table WHERE userID IN ("
+            "SELECT id FROM user_table WHERE id NOT IN (SELECT MAX(id) FROM user_table GROUP BY discordID))",
+        "DELETE FROM user_table WHERE id NOT IN (SELECT MAX(id) FROM user_table GROUP BY discordID)",
+        "DELETE FROM token_table WHERE id NOT IN (SELECT MAX(id) FROM token_table GROUP BY userID, type)",
+        "DELETE FROM app_version_table WHERE id NOT IN (SELECT MAX(id) FROM app_version_table GROUP BY name)",
+        "DELETE FROM graph_ql_query_table WHERE id NOT IN (SELECT MAX(id) FROM graph_ql_query_table GROUP BY name)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_user_discord_id ON user_table (discordID)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_token_user_type ON token_table (userID, type)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_app_version_name ON app_version_table (name)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_graph_ql_query_name ON graph_ql_query_table (name)"
+    ]
+]
+
+
+async def migrateSchema(engine: AsyncEngine) -> None:
+    """ Upgrade an existing database in place to the latest schema version. """
+    logger = Logger("Migrations")
+
+    async with engine.begin() as conn:
+        version = (await conn.execute(text("PRAGMA user_version"))).scalar()
+
+        for target in range(version, len(MIGRATIONS)):
+            logger.log(f"Upgrading database schema to version {target + 1}...")
+            for statement in MIGRATIONS[target]:
+                await conn.execute(text(statement))
+            await conn.execute(text(f"PRAGMA user_version = {target + 1}"))
@@ -1,4 +1,5 @@
 from sqlalchemy import ForeignKey
+from sqlalchemy import Index
 from sqlalchemy import String
 from sqlalchemy.orm import DeclarativeBase
 from sqlalchemy.orm import Mapped
@@ -7,6 +8,8 @@ from sqlalchemy.orm import relationship
 from sqlalchemy.orm import Session
 from sqlalchemy import create_engine
 from enum import IntEnum
+from dataclasses import dataclass
+from time import time
 from typing import List, Optional
 
 from sqlalchemy import select
@@ -18,12 +21,74 @@ class TokenType(IntEnum):
     BULLET = 3
 
 
+class BattleMode(IntEnum):
+    UNKNOWN = 0
+    REGULAR = 1
+    BANKARA = 2
+    X_MATCH = 3
+    LEAGUE  = 4
+    PRIVATE = 5
+    FEST    = 6
+
+
+class BattleRule(IntEnum):
+    UNKNOWN   = 0
+    TURF_WAR  = 1
+    AREA      = 2
+    LOFT      = 3
+    GOAL      = 4
+    CLAM      = 5
+    TRI_COLOR = 6
+
+
+class Judgement(IntEnum):
+    UNKNOWN       = 0
+    WIN           = 1
+    LOSE          = 2
+    DRAW          = 3
+    EXEMPTED_LOSE = 4
+    DEEMED_LOSE   = 5
+
+
+@dataclass(frozen=True, slots=True)
+class TokenInfo:
+    value: str
+    expiresAt: int
+
+    def isExpired(self) -> bool:
+        """ Returns a bool if the token is expired or not. """
+        return self.expiresAt <= int(time())
+
+
+@dataclass(frozen=True, slots=True)
+class TokenSet:
+    """ A snapshot of a User and all of their tokens. """
+    userID: int
+    discordID: int
+    language: str
+    country: str
+    session: TokenInfo
+    gameWeb: TokenInfo
+    bullet: TokenInfo
+
+    def getToken(self, tokenType: TokenType) -> TokenInfo:
+        """ Return the token of the given type. """
+        match tokenType:
+            case TokenType.SESSION:
+                return self.session
+            case TokenType.GAME_WEB:
+                return self.gameWeb
+            case TokenType.BULLET:
+                return self.bullet
+
+
 class Base(DeclarativeBase):
     pass
 
 
 class User(Base):
     __tablename__ = "user_table"
+    __table_args__ = (Index("ix_user_discord_id", "discordID", unique=True),)
     id: Mapped[int] = mapped_column(primary_key=True)
     discordID: Mapped[int]
     language: Mapped[str] = mapped_column(String(7))
@@ -38,6 +103,7 @@ class User(Base):
 
 class Token(Base):
     __tablename__ = "token_table"
+    __table_args__ = (Index("ix_token_user_type", "userID", "type", unique=True),)
     id: Mapped[int] = mapped_column(primary_key=True)
     userID: Mapped[int] = mapped_column(ForeignKey("user_table.id"))
 
@@ -51,6 +117,7 @@ class Token(Base):
 
 class AppVersion(Base):
     __tablename__ = "app_version_table"
+    __table_args__ = (Index("ix_app_version_name", "name", unique=True),)
     id: Mapped[int] = mapped_column(primary_key=True)
 
     name: Mapped[str] = mapped_column(String(20))
@@ -62,12 +129,80 @@ class AppVersion(Base):
 
 class GraphQLQuery(Base):
     __tablename__ = "graph_ql_query_table"
+    __table_args__ = (Index("ix_graph_ql_query_name", "name", unique=True),)
     id: Mapped[int] = mapped_column(primary_key=True)
 
     name: Mapped[str] = mapped_column(String(65))
     hash: Mapped[str] = mapped_column(String(32))
 
 
+class PresenceSubscription(Base):
+    __tablename__ = "presence_subscription_table"
+    __table_args__ = (Index("ix_presence_subscription_user", "userID", unique=True),)
+    id: Mapped[int] = mapped_column(primary_key=True)
+    userID: Mapped[int] = mapped_column(ForeignKey("user_table.id"))
+
+    def __repr__(self):
+        return f"<PresenceSubscription {self.id} -> Parent {self.userID}>"
+
+
+class Battle(Base):
+    __tablename__ = "battle_table"
+    __table_args__ = (
+        Index("ix_battle_user_battle", "userID", "battleID", unique=True),
+        Index("ix_battle_user_played", "userID", "playedAt")
+    )
+    id: Mapped[int] = mapped_column(primary_key=True)
+    userID: Mapped[int] = mapped_column(ForeignKey("user_table.id"))
+    battleID: Mapped[str] = mapped_column(String())
+
+    playedAt: Mapped[int]
+    duration: Mapped[int]
+    mode: Mapped[int]
+    rule: Mapped[int]
+    stageID: Mapped[int] = mapped_column(ForeignKey("stage_table.id"))
+    weaponID: Mapped[int] = mapped_column(ForeignKey("weapon_table.id"))
+    judgement: Mapped[int]
+    kills: Mapped[int]
+    assists: Mapped[int]
+    deaths: Mapped[int]
+    specials: Mapped[int]
+    paint: Mapped[int]
+
+    def __repr__(self):
+        return f"<Battle {self.id} -> Parent {self.userID}>"
+
+
+class Stage(Base):
+    __tablename__ = "stage_table"
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    name: Mapped[str] = mapped_column(String(50))
+
+    def __repr__(self):
+        return f"<Stage {self.id}: {self.name}>"
+
+
+class Weapon(Base):
+    __tablename__ = "weapon_table"
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    name: Mapped[str] = mapped_column(String(50))
+
+    def __repr__(self):
+        return f"<Weapon {self.id}: {self.name}>"
+
+
+class BotState(Base):
+    __tablename__ = "bot_state_table"
+    __table_args__ = (Index("ix_bot_state_name", "name", unique=True),)
+    id: Mapped[int] = mapped_column(primary_key=True)
+
+    name: Mapped[str] = mapped_column(String(20))
+    value: Mapped[str] = mapped_column(String())
+
+    def __repr__(self):
+        return f"<BotState {self.id}: {self.name}>"
+
+
 def playground(engine):
     with Session(engine) as session:
         stmt = select(User).where(User.discordID == 123456789)
@@ -0,0 +1,68 @@
+from discord import Bot
+from hashlib import sha256
+from json import dumps
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy import select
+
+from Database.Models import BotState
+from Database.Engine import SessionFactory
+from Helpers.Logger import Logger
+
+
+class CommandSync:
+    """ Syncs the application commands with Discord only when the registered tree changed.
+
+        A fingerprint of every command's name, description, options and guilds is
+        stored after each successful sync and compared on the next connect. """
+
+    FINGERPRINT_NAME = "CommandTree"
+
+    __logger = Logger("CommandSync")
+
+
+    @staticmethod
+    def fingerprint(bot: Bot) -> str:
+        """ Return a stable hash of the commands pending registration on the bot. """
+        tree = sorted(
+            (dumps(command.to_dict(), sort_keys=True, default=str), sorted(command.guild_ids or []))
+            for command in bot.pending_application_commands
+        )
+        return sha256(dumps(tree).encode()).hexdigest()
+
+
+    @staticmethod
+    async def syncIfChanged(bot: Bot, dbSessions: SessionFactory) -> bool:
+        """ Sync the changed commands if the tree differs from the last sync. Returns whether a sync ran. """
+        current = __class__.fingerprint(bot)
+
+        async with dbSessions() as session:
+            stored = await session.scalar(select(BotState.value).where(BotState.name == __class__.FINGERPRINT_NAME))
+
+        if stored == current:
+            __class__.__logger.log("Command tree unchanged, skipping sync.")
+            return False
+
+        __class__.__logger.log("Command tree changed, syncing the modified commands...")
+        # Compares against the commands Discord already has and only sends the differences.
+        await bot.sync_commands(method="individual")
+        await __class__.__storeFingerprint(dbSessions, current)
+        return True
+
+
+    @staticmethod
+    async def forceSync(bot: Bot, dbSessions: SessionFactory) -> None:
+        """ Re-register every command with Discord regardless of the stored fingerprint. """
+        __class__.__logger.log("Forcing a full command sync...")
+        await bot.sync_commands(method="bulk", force=True)
+        await __class__.__storeFingerprint(dbSessions, __class__.fingerprint(bot))
+
+
+    @staticmethod
+    async def __storeFingerprint(dbSessions: SessionFactory, fingerprint: str) -> None:
+        """ Internal helper that persists the fingerprint of the last synced tree. """
+        async with dbSessions() as session:
+            stmt = insert(BotState).values(name=__class__.FINGERPRINT_NAME, value=fingerprint)
+            await session.execute(stmt.on_conflict_do_update(
+                index_elements=[BotState.name], set_={"value": stmt.excluded.value}
+            ))
+            await session.commit()
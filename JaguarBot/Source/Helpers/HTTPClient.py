@@ -0,0 +1,99 @@
+from aiohttp import ClientSession, ClientTimeout, TCPConnector, DummyCookieJar
+from asyncio import Semaphore
+from dataclasses import dataclass
+from json import loads
+from multidict import CIMultiDict
+from urllib.parse import urlsplit
+
+from Helpers.RateLimiter import RateLimiter
+import Config
+
+
+@dataclass
+class HTTPResponse:
+    """ A fully read response returned by the shared client. """
+    status: int
+    text: str
+    headers: CIMultiDict
+
+    def json(self):
+        """ Decode the response body as JSON. """
+        return loads(self.text)
+
+
+class HTTPClient:
+    """ Process-wide asyncio HTTP client with keep-alive pooling per host. """
+
+    __session: ClientSession|None = None
+    __hostLimits: dict[str, Semaphore] = {}
+    __hostRates: dict[str, RateLimiter] = {}
+
+
+    @classmethod
+    def getSession(cls) -> ClientSession:
+        """ Return the shared session, creating it on the running loop if needed. """
+        if cls.__session is None or cls.__session.closed:
+            connector = TCPConnector(
+                limit=Config.HTTP.MAX_CONNECTIONS,
+                limit_per_host=0,   # Enforced per host by __hostLimit.
+                keepalive_timeout=Config.HTTP.KEEPALIVE_TIMEOUT,
+                ttl_dns_cache=Config.HTTP.DNS_CACHE_TTL
+            )
+            # Cookies are always supplied per request, never shared between users.
+            cls.__session = ClientSession(
+                connector=connector,
+                cookie_jar=DummyCookieJar(),
+                timeout=ClientTimeout(total=Config.HTTP.TIMEOUT)
+            )
+        return cls.__session
+
+
+    @classmethod
+    async def request(cls, method: str, url: str, **kwargs) -> HTTPResponse:
+        """ Send a request through the shared pool and read the whole body. """
+        host = urlsplit(url).hostname or ""
+        timeout = ClientTimeout(total=Config.HTTP.HOST_TIMEOUTS.get(host, Config.HTTP.TIMEOUT))
+
+        if host in Config.HTTP.HOST_RATES:
+            await cls.__hostRate(host).acquire()
+
+        async with cls.__hostLimit(host):
+            async with cls.getSession().request(method, url, timeout=timeout, **kwargs) as r:
+                return HTTPResponse(r.status, await r.text(), r.headers.copy())
+
+
+    @classmethod
+    async def get(cls, url: str, **kwargs) -> HTTPResponse:
+        """ Send a GET request. """
+        return await cls.request("GET", url, **kwargs)
+
+
+    @classmethod
+    async def post(cls, url: str, **kwargs) -> HTTPResponse:
+        """ Send a POST request. """
+        return await cls.request("POST", url, **kwargs)
+
+
+    @classmethod
+    async def close(cls) -> None:
+        """ Close the shared session and release pooled connections. """
+        if cls.__session is not None and not cls.__session.closed:
+            await cls.__session.close()
+        cls.__session = None
+
+
+    @classmethod
+    def __hostLimit(cls, host: str) -> Semaphore:
+        """ Internal helper returning the connection limiter for a host. """
+        if host not in cls.__hostLimits:
+            limit = Config.HTTP.HOST_LIMITS.get(host, Config.HTTP.MAX_CONNECTIONS_PER_HOST)
+            cls.__hostLimits[host] = Semaphore(limit)
+        return cls.__hostLimits[host]
+
+
+    @classmethod
+    def __hostRate(cls, host: str) -> RateLimiter:
+        """ Internal helper returning the request rate limiter for a host. """
+        if host not in cls.__hostRates:
+            cls.__hostRates[host] = RateLimiter(Config.HTTP.HOST_RATES[host])
+        return cls.__hostRates[host]
@@ -0,0 +1,65 @@
+from json import JSONDecoder
+from re import compile
+from typing import Any, Iterator
+
+
+_DECODER = JSONDecoder()
+_WHITESPACE = compile(r"[ \t\n\r]*")
+
+
+def iterArray(text: str, path: tuple[str, ...]) -> Iterator[tuple[Any, int]]:
+    """ Decode the elements of the array found at `path` one at a time.
+
+        Yields each element with the offset its text ends at, so callers that stop
+        early never decode the rest of the document. Values of other keys met on
+        the way are skipped. Raises ValueError if the path is missing or not an array. """
+    i = _findArray(text, path)
+
+    i = _skip(text, i)
+    if text[i:i + 1] == "]":
+        return
+
+    while True:
+        element, i = _DECODER.raw_decode(text, _skip(text, i))
+        yield element, i
+
+        i = _skip(text, i)
+        if text[i:i + 1] == "]":
+            return
+        i = _expect(text, i, ",")
+
+
+def _findArray(text: str, path: tuple[str, ...]) -> int:
+    """ Return the offset just after the opening bracket of the array at `path`. """
+    i = 0
+    for key in path:
+        i = _expect(text, i, "{")
+        while True:
+            i = _skip(text, i)
+            if text[i:i + 1] == "}":
+                raise ValueError(f"Key '{key}' not found")
+
+            name, i = _DECODER.raw_decode(text, i)
+            i = _skip(text, _expect(text, i, ":"))
+            if name == key:
+                break
+
+            _, i = _DECODER.raw_decode(text, i)
+            i = _skip(text, i)
+            if text[i:i + 1] == ",":
+                i += 1
+
+    return _expect(text, i, "[")
+
+
+def _expect(text: str, i: int, char: str) -> int:
+    """ Return the offset after `char`, which must be the next non-whitespace character. """
+    i = _skip(text, i)
+    if text[i:i + 1] != char:
+        raise ValueError(f"Expected '{char}' at offset {i}")
+    return i + 1
+
+
+def _skip(text: str, i: int) -> int:
+    """ Return the offset of the next non-whitespace character. """
+    return _WHITESPACE.match(text, i).end()
@@ -0,0 +1,26 @@
+from base64 import urlsafe_b64decode
+from json import loads
+from time import time
+
+
+def getExpiry(token: str) -> int|None:
+    """ Return the `exp` claim of a JWT, or None if the token has none. """
+    try:
+        payload = token.split(".")[1]
+        claims = loads(urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        return int(claims["exp"])
+    except Exception:
+        return None
+
+
+def resolveExpiry(token: str, expiresIn: int|None, fallbackOffset: int) -> int:
+    """ Find when a token expires, preferring its `exp` claim, then the
+        `expires_in` lifetime given alongside it, then a fixed offset. """
+    expiry = getExpiry(token)
+    if expiry is not None:
+        return expiry
+
+    if expiresIn:
+        return int(time()) + int(expiresIn)
+
+    return int(time()) + fallbackOffset
@@ -0,0 +1,27 @@
+from asyncio import Lock, sleep
+from time import monotonic
+
+
+class RateLimiter:
+    """ Token bucket allowing `rate` acquisitions per second with bursts of up to `burst`. """
+
+    def __init__(self, rate: float, burst: int|None = None) -> None:
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1, int(rate))
+        self.__tokens = float(self.burst)
+        self.__updatedAt = monotonic()
+        self.__lock = Lock()
+
+    async def acquire(self) -> None:
+        """ Wait until a request is allowed. Waiters are served in arrival order. """
+        async with self.__lock:
+            now = monotonic()
+            self.__tokens = min(self.burst, self.__tokens + (now - self.__updatedAt) * self.rate)
+            self.__updatedAt = now
+
+            if self.__tokens < 1:
+                await sleep((1 - self.__tokens) / self.rate)
+                self.__tokens = 1
+                self.__updatedAt = monotonic()
+
+            self.__tokens -= 1
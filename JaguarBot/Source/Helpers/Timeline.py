@@ -0,0 +1,18 @@
+from time import perf_counter
+
+from Helpers.Logger import Logger
+
+
+class Timeline:
+    """ Log how long each stage of a long running process took. """
+
+    def __init__(self, name: str, start: float|None = None) -> None:
+        self.logger = Logger(name)
+        self.start = start if start is not None else perf_counter()
+        self.last = self.start
+
+    def mark(self, stage: str) -> None:
+        """ Log the time spent since the previous mark and since the start. """
+        now = perf_counter()
+        self.logger.log(f"{stage}: {(now - self.last) * 1000:.0f}ms (total {(now - self.start) * 1000:.0f}ms)")
+        self.last = now
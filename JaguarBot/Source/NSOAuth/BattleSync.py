@@ -0,0 +1,185 @@
+from sqlalchemy import select, bindparam
+from sqlalchemy.dialects.sqlite import insert
+from asyncio import Lock, Semaphore, Task, create_task, gather, sleep
+
+from Database.Models import Battle, Stage, Weapon, User, TokenSet
+from Database.Ext import FindAbstractor
+from Database.Engine import SessionFactory
+from Helpers.Logger import Logger
+from NSOAuth.GraphQL.BattleQueries import BattleDetail, latestBattleIDs, battleDetail
+from Config import BATTLE_SYNC
+
+
+class BattleSync:
+    """ Copies each User's VS battle history into the local database.
+
+        A sync lists the latest battles and only requests the details of battles
+        that are not stored yet. """
+
+    __KNOWN_IDS = select(Battle.battleID).where(Battle.userID == bindparam("userID")) \
+                                         .where(Battle.battleID.in_(bindparam("battleIDs", expanding=True)))
+
+    __locks: dict[int, Lock] = {}
+    __background: set[Task] = set()
+    __revisions: dict[int, int] = {}
+    __task: Task|None = None
+    __logger = Logger("BattleSync")
+
+
+    @staticmethod
+    async def syncUser(dbSessions: SessionFactory, tokens: TokenSet) -> int|None:
+        """ Store a User's new battles. Returns the number added, or None if the list failed to load.
+            Concurrent syncs of the same User run one after the other. """
+        lock = __class__.__locks.setdefault(tokens.userID, Lock())
+        async with lock:
+            battleIDs = await latestBattleIDs(dbSessions, tokens)
+            if battleIDs is None:
+                return None
+
+            async with dbSessions() as session:
+                known = set(await session.scalars(
+                    __class__.__KNOWN_IDS, {"userID": tokens.userID, "battleIDs": battleIDs}
+                ))
+
+            newIDs = [battleID for battleID in battleIDs if battleID not in known]
+            if not newIDs:
+                return 0
+
+            limit = Semaphore(BATTLE_SYNC.CONCURRENCY)
+
+            async def fetchDetail(battleID: str) -> BattleDetail|None:
+                async with limit:
+                    try:
+                        # Re-read for each request, so tokens refreshed by an earlier one are used.
+                        current = await __class__.__currentTokens(dbSessions, tokens.userID) or tokens
+                        return await battleDetail(dbSessions, current, vsResultId=battleID)
+                    except (KeyError, TypeError, ValueError, IndexError) as ex:
+                        # One malformed battle must not keep the others from being stored.
+                        __class__.__logger.warn(f"Failed to decode battle {battleID} of User {tokens.discordID} -> {str(ex)}")
+                        return None
+
+            details = [detail for detail in await gather(*map(fetchDetail, newIDs)) if detail is not None]
+            if details:
+                await __class__.__store(dbSessions, tokens.userID, details)
+
+            if len(details) < len(newIDs):
+                __class__.__logger.warn(f"Failed to load {len(newIDs) - len(details)} battles for User {tokens.discordID}, retrying next sync.")
+
+            return len(details)
+
+
+    @staticmethod
+    def syncInBackground(dbSessions: SessionFactory, tokens: TokenSet) -> None:
+        """ Start syncing a User without waiting for it, unless they are already being synced. """
+        lock = __class__.__locks.get(tokens.userID)
+        if lock is not None and lock.locked():
+            return
+
+        task = create_task(__class__.__syncLogged(dbSessions, tokens))
+        __class__.__background.add(task)
+        task.add_done_callback(__class__.__background.discard)
+
+
+    @staticmethod
+    def revision(userID: int) -> int:
+        """ Return a number that changes whenever new battles are stored for the User. """
+        return __class__.__revisions.get(userID, 0)
+
+
+    @staticmethod
+    def startSyncLoop(dbSessions: SessionFactory) -> None:
+        """ Periodically sync every User in the background. """
+        if __class__.__task is None:
+            __class__.__task = create_task(__class__.__syncLoop(dbSessions))
+
+
+    @staticmethod
+    def stopSyncLoop() -> None:
+        """ Stop the background sync. """
+        if __class__.__task is not None:
+            __class__.__task.cancel()
+            __class__.__task = None
+
+
+    @staticmethod
+    async def __syncLoop(dbSessions: SessionFactory) -> None:
+        """ Internal loop that syncs every User on the configured interval. """
+        limit = Semaphore(BATTLE_SYNC.USERS)
+
+        async def syncOne(userID: int) -> None:
+            async with limit:
+                # Loaded right before the sync, so tokens refreshed by earlier syncs are used.
+                try:
+                    tokens = await __class__.__currentTokens(dbSessions, userID)
+                except Exception as ex:
+                    __class__.__logger.warn(f"Failed to load the tokens of User {userID} -> {str(ex)}")
+                    return
+
+                if tokens is not None:
+                    await __class__.__syncLogged(dbSessions, tokens)
+
+        while True:
+            try:
+                async with dbSessions() as session:
+                    userIDs = list(await session.scalars(select(User.id)))
+
+                await gather(*map(syncOne, userIDs))
+            except Exception as ex:
+                __class__.__logger.warn(f"Failed to sync the battles -> {str(ex)}")
+
+            await sleep(BATTLE_SYNC.INTERVAL)
+
+
+    @staticmethod
+    async def __currentTokens(dbSessions: SessionFactory, userID: int) -> TokenSet|None:
+        """ Internal helper returning a User's latest tokens, None if the User was removed.
+            Served from the TokenSetCache, which a token refresh invalidates. """
+        async with dbSessions() as session:
+            return (await FindAbstractor(session).getTokenSets([userID])).get(userID)
+
+
+    @staticmethod
+    async def __syncLogged(dbSessions: SessionFactory, tokens: TokenSet) -> None:
+        """ Internal helper that syncs a User, logging rather than raising any error. """
+        try:
+            await __class__.syncUser(dbSessions, tokens)
+        except Exception as ex:
+            __class__.__logger.warn(f"Sync of User {tokens.discordID} raised -> {str(ex)}")
+
+
+    @staticmethod
+    async def __store(dbSessions: SessionFactory, userID: int, details: list[BattleDetail]) -> None:
+        """ Internal helper that inserts battles along with their stage and weapon names. """
+        async with dbSessions() as session:
+            stages  = {detail.stageID: detail.stageName for detail in details}
+            weapons = {detail.weaponID: detail.weaponName for detail in details}
+
+            stmt = insert(Stage).values([{"id": id, "name": name} for id, name in stages.items()])
+            await session.execute(stmt.on_conflict_do_update(index_elements=[Stage.id], set_={"name": stmt.excluded.name}))
+
+            stmt = insert(Weapon).values([{"id": id, "name": name} for id, name in weapons.items()])
+            await session.execute(stmt.on_conflict_do_update(index_elements=[Weapon.id], set_={"name": stmt.excluded.name}))
+
+            await session.execute(insert(Battle).values([
+                {
+                    "userID": userID,
+                    "battleID": detail.battleID,
+                    "playedAt": detail.playedAt,
+                    "duration": detail.duration,
+                    "mode": detail.mode,
+                    "rule": detail.rule,
+                    "stageID": detail.stageID,
+                    "weaponID": detail.weaponID,
+                    "judgement": detail.judgement,
+                    "kills": detail.kills,
+                    "assists": detail.assists,
+                    "deaths": detail.deaths,
+                    "specials": detail.specials,
+                    "paint": detail.paint
+                }
+                for detail in details
+            ]).on_conflict_do_nothing(index_elements=[Battle.userID, Battle.battleID]))
+
+            await session.commit()
+
+        __class__.__revisions[userID] = __class__.revision(userID) + 1
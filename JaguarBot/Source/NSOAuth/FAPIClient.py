@@ -0,0 +1,175 @@
+from asyncio import CancelledError, FIRST_COMPLETED, Task, create_task, wait
+from collections import deque
+from dataclasses import dataclass, field
+from json import loads, dumps
+from time import monotonic
+
+from Helpers.HTTPClient import HTTPClient
+from Helpers.Logger import Logger
+from Config import F_API
+
+
+@dataclass
+class FProvider:
+    """ An f-API endpoint with its health and latency record. """
+    url: str
+    ewmaLatency: float|None = None
+    latencies: deque = field(default_factory=lambda: deque(maxlen=F_API.LATENCY_SAMPLES))
+    consecutiveFailures: int = 0
+    unhealthyUntil: float = 0
+
+    requests: int = 0
+    successes: int = 0
+    failures: int = 0
+    hedges: int = 0
+    hedgeWins: int = 0
+
+    def isHealthy(self, now: float) -> bool:
+        """ Returns a bool if the provider is not cooling down after repeated failures. """
+        return self.unhealthyUntil <= now
+
+    def p95Latency(self) -> float|None:
+        """ Returns the 95th percentile of the recent latencies, None without enough samples. """
+        if len(self.latencies) < F_API.HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+
+
+class FAPIClient:
+    """ Requests 'f' tokens from a list of f-API providers.
+
+        The healthy provider with the lowest EWMA latency is asked first, others are
+        tried in turn when it fails. With hedging, the next provider is also asked
+        once the first has been slower than its own p95 latency, and the first
+        answer wins. """
+
+    __default: "FAPIClient|None" = None
+
+
+    def __init__(self, urls: list[str], hedge: bool = F_API.HEDGE) -> None:
+        self.providers = [FProvider(url) for url in urls]
+        self.hedge = hedge
+        self.logger = Logger("FAPIClient")
+
+
+    @staticmethod
+    def default() -> "FAPIClient":
+        """ Return the shared client for the configured providers. """
+        if __class__.__default is None:
+            __class__.__default = FAPIClient(F_API.PROVIDERS)
+        return __class__.__default
+
+
+    async def generate(self, body: dict, headers: dict) -> dict:
+        """ Send an f-API request body, returning the decoded answer of the first provider to succeed.
+            Raises RuntimeError if every provider failed. """
+        ordered = self.__rank()
+        pending: dict[Task, FProvider] = {}
+        hedged: set[Task] = set()
+        started = 0
+
+        def launch() -> Task:
+            nonlocal started
+            provider = ordered[started]
+            started += 1
+            task = create_task(self.__call(provider, body, headers))
+            pending[task] = provider
+            return task
+
+        launch()
+        try:
+            while pending:
+                timeout = None
+                if self.hedge and len(pending) == 1 and started < len(ordered):
+                    timeout = self.__hedgeDelay(next(iter(pending.values())))
+
+                done, _ = await wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+                if not done:
+                    ordered[started].hedges += 1
+                    hedged.add(launch())
+                    continue
+
+                for task in done:
+                    provider = pending.pop(task)
+                    if task.exception() is None:
+                        if task in hedged:
+                            provider.hedgeWins += 1
+                        return task.result()
+
+                # Fail over once nothing is left running.
+                if not pending and started < len(ordered):
+                    launch()
+        finally:
+            for task in pending:
+                task.cancel()
+
+        raise RuntimeError("Every f-API provider failed.")
+
+
+    def __rank(self) -> list[FProvider]:
+        """ Internal helper ordering the providers, healthy and fastest first.
+            Providers without a latency yet are tried early so they get one. """
+        now = monotonic()
+        return sorted(
+            self.providers,
+            key=lambda provider: (
+                not provider.isHealthy(now),
+                provider.ewmaLatency if provider.ewmaLatency is not None else 0
+            )
+        )
+
+
+    def __hedgeDelay(self, provider: FProvider) -> float:
+        """ Internal helper returning how long to wait on a provider before asking the next one. """
+        p95 = provider.p95Latency()
+        if p95 is None:
+            return F_API.HEDGE_DEFAULT_DELAY
+        return max(p95, F_API.HEDGE_MIN_DELAY)
+
+
+    async def __call(self, provider: FProvider, body: dict, headers: dict) -> dict:
+        """ Internal helper that sends the request to one provider and records the outcome. """
+        provider.requests += 1
+        start = monotonic()
+        try:
+            response = await HTTPClient.post(provider.url, data=dumps(body), headers=headers)
+            if response.status != 200:
+                raise RuntimeError(f"Status {response.status}")
+
+            result = loads(response.text)
+            if not all(key in result for key in ("f", "request_id", "timestamp")):
+                raise RuntimeError("Missing keys in the response")
+        except CancelledError:
+            raise
+        except Exception as ex:
+            self.__recordFailure(provider)
+            self.logger.warn(f"f-API provider {provider.url} failed -> {str(ex)}")
+            raise
+
+        self.__recordSuccess(provider, monotonic() - start)
+        return result
+
+
+    def __recordSuccess(self, provider: FProvider, latency: float) -> None:
+        """ Internal helper that updates a provider's latency after a success. """
+        provider.successes += 1
+        provider.consecutiveFailures = 0
+        provider.latencies.append(latency)
+
+        if provider.ewmaLatency is None:
+            provider.ewmaLatency = latency
+        else:
+            provider.ewmaLatency = F_API.EWMA_ALPHA * latency + (1 - F_API.EWMA_ALPHA) * provider.ewmaLatency
+
+
+    def __recordFailure(self, provider: FProvider) -> None:
+        """ Internal helper that counts a failure, benching the provider after too many in a row. """
+        provider.failures += 1
+        provider.consecutiveFailures += 1
+
+        if provider.consecutiveFailures >= F_API.MAX_FAILURES:
+            provider.unhealthyUntil = monotonic() + F_API.FAILURE_COOLDOWN
+            provider.consecutiveFailures = 0
+            self.logger.warn(f"f-API provider {provider.url} is unhealthy, skipping it for {F_API.FAILURE_COOLDOWN}s.")
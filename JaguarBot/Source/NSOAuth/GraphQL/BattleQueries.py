@@ -0,0 +1,64 @@
+from base64 import b64decode
+from dataclasses import dataclass
+from datetime import datetime
+
+from Database.Models import BattleMode, BattleRule, Judgement
+from NSOAuth.GraphQL.Queries import persistedQuery
+
+
+@dataclass(frozen=True, slots=True)
+class BattleDetail:
+    """ The parts of a VS battle that are stored locally. """
+    battleID: str
+    playedAt: int
+    duration: int
+    mode: BattleMode
+    rule: BattleRule
+    stageID: int
+    stageName: str
+    weaponID: int
+    weaponName: str
+    judgement: Judgement
+    kills: int
+    assists: int
+    deaths: int
+    specials: int
+    paint: int
+
+
+def decodeID(encoded: str) -> int:
+    """ Return the number at the end of a SplatNet3 ID, e.g. 12 for base64("VsStage-12"). """
+    return int(b64decode(encoded).decode().rsplit("-", 1)[1])
+
+
+@persistedQuery("LatestBattleHistoriesQuery")
+def latestBattleIDs(result: dict) -> list[str]:
+    """ The IDs of the most recent VS battles, newest first. """
+    groups = result["data"]["latestBattleHistories"]["historyGroups"]["nodes"]
+    return [battle["id"] for group in groups for battle in group["historyDetails"]["nodes"]]
+
+
+@persistedQuery("VsHistoryDetailQuery")
+def battleDetail(result: dict) -> BattleDetail:
+    """ A single VS battle, requested with the `vsResultId` variable. """
+    detail = result["data"]["vsHistoryDetail"]
+    player = detail["player"]
+    stats = player.get("result") or {}
+
+    return BattleDetail(
+        detail["id"],
+        int(datetime.fromisoformat(detail["playedTime"].replace("Z", "+00:00")).timestamp()),
+        detail.get("duration") or 0,
+        BattleMode.__members__.get(detail["vsMode"]["mode"], BattleMode.UNKNOWN),
+        BattleRule.__members__.get(detail["vsRule"]["rule"], BattleRule.UNKNOWN),
+        decodeID(detail["vsStage"]["id"]),
+        detail["vsStage"]["name"],
+        decodeID(player["weapon"]["id"]),
+        player["weapon"]["name"],
+        Judgement.__members__.get(detail["judgement"], Judgement.UNKNOWN),
+        stats.get("kill") or 0,
+        stats.get("assist") or 0,
+        stats.get("death") or 0,
+        stats.get("special") or 0,
+        player.get("paint") or 0
+    )
@@ -0,0 +1,122 @@
+from dataclasses import dataclass
+from enum import IntEnum
+
+from Config import DISCORD_EMOJI
+
+
+class OnlineState(IntEnum):
+    UNKNOWN            = 0
+    OFFLINE            = 1
+    ONLINE             = 2
+    VS_MODE_MATCHING   = 3
+    COOP_MODE_MATCHING = 4
+    VS_MODE_FIGHTING   = 5
+    COOP_MODE_FIGHTING = 6
+    MINI_GAME_PLAYING  = 7
+
+
+class FriendMode(IntEnum):
+    NONE         = 0
+    TURF_WAR     = 1
+    ANARCHY      = 2
+    X_BATTLE     = 3
+    CHALLENGE    = 4
+    PRIVATE      = 5
+    SPLATFEST    = 6
+    OTHER_VS     = 7
+    SALMON_RUN   = 8
+    BIG_RUN      = 9
+    EGGSTRA_WORK = 10
+
+
+# Decoding tables, unlisted values fall back to UNKNOWN / OTHER_VS / SALMON_RUN.
+ONLINE_STATES = {state.name: state for state in OnlineState}
+
+VS_MODES = {
+    "REGULAR": FriendMode.TURF_WAR,
+    "BANKARA": FriendMode.ANARCHY,
+    "X_MATCH": FriendMode.X_BATTLE,
+    "LEAGUE":  FriendMode.CHALLENGE,
+    "PRIVATE": FriendMode.PRIVATE,
+    "FEST":    FriendMode.SPLATFEST
+}
+
+COOP_RULES = {
+    "BIG_RUN":      FriendMode.BIG_RUN,
+    "TEAM_CONTEST": FriendMode.EGGSTRA_WORK
+}
+
+# Rendering tables. A label of None shows the VS mode name sent by SplatNet3.
+MODE_LABELS = {
+    FriendMode.NONE:         None,
+    FriendMode.TURF_WAR:     "Turf War",
+    FriendMode.ANARCHY:      None,
+    FriendMode.X_BATTLE:     None,
+    FriendMode.CHALLENGE:    None,
+    FriendMode.PRIVATE:      None,
+    FriendMode.SPLATFEST:    None,
+    FriendMode.OTHER_VS:     None,
+    FriendMode.SALMON_RUN:   "Salmon Run",
+    FriendMode.BIG_RUN:      "Big Run",
+    FriendMode.EGGSTRA_WORK: "Eggstra Work"
+}
+
+MODE_EMOJI = {
+    FriendMode.NONE:         "",
+    FriendMode.TURF_WAR:     DISCORD_EMOJI.TURF_WAR,
+    FriendMode.ANARCHY:      DISCORD_EMOJI.ANARCHY,
+    FriendMode.X_BATTLE:     DISCORD_EMOJI.X_BATTLE,
+    FriendMode.CHALLENGE:    DISCORD_EMOJI.LEAGUE,
+    FriendMode.PRIVATE:      DISCORD_EMOJI.PRIVATE_BATTLE,
+    FriendMode.SPLATFEST:    DISCORD_EMOJI.SPLATFEST,
+    FriendMode.OTHER_VS:     "",
+    FriendMode.SALMON_RUN:   DISCORD_EMOJI.SALMON_RUN,
+    FriendMode.BIG_RUN:      DISCORD_EMOJI.BIG_RUN,
+    FriendMode.EGGSTRA_WORK: DISCORD_EMOJI.EGGSTRA_WORK
+}
+
+
+@dataclass(frozen=True, slots=True)
+class Friend:
+    """ A SplatNet3 friend, decoded once from a friend list node. """
+    id: str
+    playerName: str
+    isLocked: bool
+    state: OnlineState
+    mode: FriendMode
+    vsModeName: str|None
+
+    @staticmethod
+    def fromNode(node: dict) -> "Friend":
+        """ Decode a node of the friend list. """
+        vsMode = node.get("vsMode")
+
+        if node.get("coopRule"):
+            mode = COOP_RULES.get(node["coopRule"], FriendMode.SALMON_RUN)
+        elif vsMode:
+            mode = VS_MODES.get(vsMode["mode"], FriendMode.OTHER_VS)
+        else:
+            mode = FriendMode.NONE
+
+        return Friend(
+            node["id"],
+            node.get("playerName") or "",
+            bool(node.get("isLocked")),
+            ONLINE_STATES.get(node["onlineState"], OnlineState.UNKNOWN),
+            mode,
+            vsMode["name"] if vsMode else None
+        )
+
+    def isPlaying(self) -> bool:
+        """ Returns a bool if the friend is in game, rather than just online or offline. """
+        return self.state != OnlineState.ONLINE and self.state != OnlineState.OFFLINE
+
+    @property
+    def label(self) -> str:
+        """ The name of the mode the friend is playing. """
+        return MODE_LABELS[self.mode] or self.vsModeName or ""
+
+    @property
+    def emoji(self) -> str:
+        """ The Discord emoji of the mode the friend is playing. """
+        return MODE_EMOJI[self.mode]
@@ -1,29 +1,47 @@
-from sqlalchemy.orm import Session
 from typing import Tuple
 
-from Database.Models import User
+from Database.Models import TokenSet
+from Database.Engine import SessionFactory
 from NSOAuth.GraphQL.GQLRequest import GQLRequest
+from NSOAuth.GraphQL.Friend import Friend
 
 
 class FriendListQuery(GQLRequest):
     MAX_PLAYERS = 25
-    def __init__(self, dbSession: Session, user: User) -> None:
+    CACHE_TTL = 30
+    STALE_TTL = 90
+
+    # Playing friends are sorted first, nothing after the first idle friend is decoded.
+    STREAM_PATH = ("data", "friends", "nodes")
+
+    def __init__(self, dbSessions: SessionFactory, tokens: TokenSet) -> None:
         self.queryName = __class__.__name__
         self.loggerName = __class__.__name__
 
-        super().__init__(dbSession, user)
+        super().__init__(dbSessions, tokens)
+
+    def decodeNode(self, node: dict) -> Friend:
+        return Friend.fromNode(node)
+
+    def keepParsing(self, node: Friend) -> bool:
+        """ Keep decoding while the friends are in game. """
+        return node.isPlaying()
 
-    def getPlayingFriends(self) -> Tuple[int, list]:
+    def getPlayingFriends(self) -> Tuple[int, list[Friend]]:
         """ Returns the number and first MAX_PLAYERS players currently in game. """
+        onlineFriends = self.getAllPlayingFriends()
+        return (len(onlineFriends), onlineFriends[0:self.MAX_PLAYERS])
+
+    def getAllPlayingFriends(self) -> list[Friend]:
+        """ Returns every player currently in game. """
         
         friendList = self.gqlResult['data']['friends']['nodes']
         
         onlineFriends = []
         for friend in friendList:
-            friendStatus = friend['onlineState']
-            if friendStatus != 'ONLINE' and friendStatus != 'OFFLINE':
+            if friend.isPlaying():
                 onlineFriends.append(friend)
             else:
                 break
         
-        return (len(onlineFriends), onlineFriends[0:self.MAX_PLAYERS])
+        return onlineFriends
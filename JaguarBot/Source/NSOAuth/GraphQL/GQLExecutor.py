@@ -0,0 +1,42 @@
+from asyncio import Semaphore, create_task, wait
+
+from NSOAuth.GraphQL.GQLRequest import GQLRequest
+from Config import FAN_OUT
+
+
+class GQLExecutor:
+    """ Runs many Users' GraphQL Requests concurrently under a global cap.
+
+        Requests still running at the deadline are abandoned by the caller, their
+        upstream fetch still finishes and fills the response cache for next time. """
+
+    __limit: Semaphore|None = None
+
+
+    @staticmethod
+    async def sendAll(requests: list[GQLRequest], deadline: float = FAN_OUT.DEADLINE, **kwargs) -> list[GQLRequest]:
+        """ Send every request with the same variables.
+            Returns the requests that succeeded within `deadline` seconds. """
+        if not requests:
+            return []
+
+        tasks = {create_task(__class__.__send(request, kwargs)): request for request in requests}
+        done, pending = await wait(tasks, timeout=deadline)
+
+        for task in pending:
+            task.cancel()
+
+        return [
+            tasks[task] for task in done
+            if not task.cancelled() and task.exception() is None and task.result()
+        ]
+
+
+    @staticmethod
+    async def __send(request: GQLRequest, variables: dict) -> bool:
+        """ Internal helper that sends one request once a slot is free. """
+        if __class__.__limit is None:
+            __class__.__limit = Semaphore(FAN_OUT.CONCURRENCY)
+
+        async with __class__.__limit:
+            return await request.sendGQLRequest(**variables)
@@ -1,19 +1,52 @@
-from sqlalchemy.orm import Session
-from requests import post
-from json import loads
+from asyncio import Task, create_task, shield
+from json import loads, dumps
+from typing import AsyncIterator
 
-from Database.Models import User, TokenType
+from Database.Models import TokenSet
 from Database.Ext import FindAbstractor
+from Database.Engine import SessionFactory
 from Helpers.Logger import Logger
+from Helpers.HTTPClient import HTTPClient
+from Helpers.JSONStream import iterArray
 from NSOAuth.RefreshManager import RefreshManager
 from NSOAuth.VersionManager import VersionManager
+from NSOAuth.GraphQL.ResponseCache import GQLResponseCache
+from NSOAuth.GraphQL.PersistedQuery import PersistedQuery
 
 class GQLRequest:
     """ Interface that defines how GraphQL Requests are made. """
 
     GRAPHQL_ENDPOINT = "https://api.lp1.av5ja.srv.nintendo.net/api/graphql"
 
-    def __init__(self, dbSession: Session, user: User) -> None:
+    # Headers shared by every request, the per-User ones are added when sending.
+    BASE_HEADERS = {
+        'User-Agent':       "Mozilla/5.0 (Linux; Android 11; Pixel 5) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/94.0.4606.61 Mobile Safari/537.36",
+        'Content-Type':     'application/json',
+        'Accept':           '*/*',
+        'Origin':           GRAPHQL_ENDPOINT,
+        'X-Requested-With': 'com.nintendo.znca',
+        'Accept-Encoding':  'gzip, deflate'
+    }
+
+    # Replaced in Subclass to cache responses. For STALE_TTL seconds after
+    # CACHE_TTL has passed, the old response is served while a new one is fetched.
+    CACHE_TTL = 0
+    STALE_TTL = 0
+
+    # Replaced in Subclass for data that is the same for every User. The response is
+    # cached and coalesced across Users, the tokens only decide who sends the request.
+    GLOBAL_SCOPE = False
+
+    # Requests in flight keyed by (User ID, query hash, variables), shared by identical callers.
+    __inFlight: dict[tuple, Task] = {}
+
+    # Replaced in Subclass to decode only the start of a long array, see `decodeNode` and `keepParsing`.
+    STREAM_PATH: tuple[str, ...]|None = None
+
+    # Variable a paginated query takes the `pageInfo.endCursor` of the previous page in.
+    CURSOR_VARIABLE = "cursor"
+
+    def __init__(self, dbSessions: SessionFactory, tokens: TokenSet) -> None:
         # Replaced in Subclass
         self.queryName: str
         self.gqlResult: dict
@@ -21,91 +54,240 @@ class GQLRequest:
         
         # Common
         self.logger = Logger(self.loggerName)
-        self.dbSession: Session = dbSession
-        self.user: User = user
-        self.fAbs = FindAbstractor(self.dbSession)
-        self.vManager = VersionManager(self.dbSession)
+        self.dbSessions: SessionFactory = dbSessions
+        self.tokens: TokenSet = tokens
+        # When False, a stale cached response is fetched again instead of being served.
+        self.serveStale: bool = True
 
-    async def refreshTokens(self, user: User) -> bool|None:
+    async def refreshTokens(self) -> bool|None:
         """ Attempts to refresh invalid tokens.
             Returns True if the tokens were updated, False if they failed to update,
             and returns None if the tokens were not expired. """
         
-        gToken = self.fAbs.getToken(user, TokenType.GAME_WEB)
-        bToken = self.fAbs.getToken(user, TokenType.BULLET)
+        userID = self.tokens.userID
 
-        if self.fAbs.isTokenExpired(gToken):
-            return await RefreshManager.refreshGameWeb(self.dbSession, user)
+        if self.tokens.gameWeb.isExpired():
+            return await RefreshManager.refreshGameWeb(self.dbSessions, userID)
         
-        if self.fAbs.isTokenExpired(bToken):
-            if not await RefreshManager.refreshBullet(self.dbSession, user):
-                return await RefreshManager.refreshGameWeb(self.dbSession, user)
+        if self.tokens.bullet.isExpired():
+            if not await RefreshManager.refreshBullet(self.dbSessions, userID):
+                return await RefreshManager.refreshGameWeb(self.dbSessions, userID)
     
 
+    def cacheTTL(self) -> int:
+        """ Replaced in Subclass when the lifetime of a response is not fixed.
+            Returns how many seconds a response fetched now stays fresh. """
+        return self.CACHE_TTL
+
+
+    def decodeNode(self, node: dict):
+        """ Replaced in Subclass. Converts each node of the array at STREAM_PATH
+            before it is checked by `keepParsing` and stored. """
+        return node
+
+
+    def keepParsing(self, node) -> bool:
+        """ Replaced in Subclass. Called with each node of the array at STREAM_PATH,
+            returning False stops decoding and drops the node and everything after it. """
+        return True
+
+
     async def sendGQLRequest(self, **kwargs) -> bool:
-        """ Sends the GraphQL Request to the server. Returns bool if it was successful."""
+        """ Sends the GraphQL Request to the server, or serves it from the response cache.
+            Returns bool if it was successful."""
+        key = (self.__scope(), self.queryName, dumps(kwargs, sort_keys=True))
+
+        cached = GQLResponseCache.get(key) if self.cacheTTL() > 0 else None
+        if cached is not None and (cached.isFresh() or self.serveStale):
+            if not cached.isFresh():
+                self.__revalidate(key, kwargs)
+            self.gqlResult = cached.result
+            return True
+
+        task = self.__joinFetch(key, kwargs)
+        if task is None:
+            return False
+
+        result = await shield(task)
+        if result is None:
+            return False
+
+        self.gqlResult = result
+        return True
+
+
+    async def iterNodes(self, connectionPath: tuple[str, ...], **kwargs) -> AsyncIterator:
+        """ Walk every node of the Relay connection at `connectionPath`, page by page.
+
+            The next page is requested while the caller handles the current one, so at
+            most two pages are held at once. Break out of the loop to stop early.
+            Pages are decoded whole, not shared with identical requests and never
+            stored in the response cache.
+            Raises RuntimeError if a page fails to load. """
+        page = create_task(self.__fetchPage(connectionPath, kwargs))
+        try:
+            while page is not None:
+                connection = await page
+                page = None
+
+                pageInfo = connection.get("pageInfo") or {}
+                if pageInfo.get("hasNextPage"):
+                    nextVariables = {**kwargs, self.CURSOR_VARIABLE: pageInfo["endCursor"]}
+                    page = create_task(self.__fetchPage(connectionPath, nextVariables))
+
+                nodes = connection["nodes"]
+                del connection
+                for node in nodes:
+                    yield self.decodeNode(node)
+        finally:
+            if page is not None:
+                page.cancel()
+
+
+    async def __fetchPage(self, connectionPath: tuple[str, ...], variables: dict) -> dict:
+        """ Internal helper that loads one page and returns the connection in it. """
+        key = (self.__scope(), self.queryName, dumps(variables, sort_keys=True))
+
+        query = VersionManager.registry().getQuery(self.queryName)
+        # Awaited directly, so stopping `iterNodes` early cancels the request.
+        result = await self.__fetch(key, query, variables, paged=True) if query is not None else None
+        if result is None:
+            raise RuntimeError(f"Failed to load a page of {self.queryName} for User {self.tokens.discordID}")
+
+        for name in connectionPath:
+            result = result[name]
+        return result
+
+
+    def __revalidate(self, key: tuple, variables: dict) -> None:
+        """ Internal helper that refreshes a stale cached response in the background. """
+        self.__joinFetch(key, variables)
+
+
+    def __joinFetch(self, key: tuple, variables: dict) -> Task|None:
+        """ Internal helper returning the in-flight request for these variables,
+            starting one if no identical request is running.
+            Returns None if the query's hash is not in the registry. """
+        query = VersionManager.registry().getQuery(self.queryName)
+        if query is None:
+            self.logger.warn(f"No persisted query hash is known for {self.queryName}.")
+            return None
+
+        flightKey = (key[0], query.sha256Hash, key[2])
+
+        task = __class__.__inFlight.get(flightKey)
+        if task is None:
+            task = create_task(self.__fetch(key, query, variables))
+            __class__.__inFlight[flightKey] = task
+            task.add_done_callback(lambda _: __class__.__inFlight.pop(flightKey, None))
+        return task
+
+
+    async def __fetch(self, key: tuple, query: PersistedQuery, variables: dict, paged: bool = False) -> dict|None:
+        """ Internal helper that sends the request, including the retry after a token
+            refresh, and caches the result. A `paged` result, one page of `iterNodes`,
+            is decoded whole, without STREAM_PATH, and not cached.
+            Returns None if the request failed. """
 
         # Refresh known expired tokens
-        status = await self.refreshTokens(self.user)
+        status = await self.refreshTokens()
         if status != None:
             if status:
-                self.logger.log(f"Refreshed tokens for User {self.user.discordID}")
+                self.logger.log(f"Refreshed tokens for User {self.tokens.discordID}")
             else:
-                self.logger.warn(f"Failed to refresh tokens for User {self.user.discordID}!")
+                self.logger.warn(f"Failed to refresh tokens for User {self.tokens.discordID}!")
+
+            await self.__reloadTokens()
+
+        tokens = self.tokens
 
-        gToken = self.fAbs.getToken(self.user, TokenType.GAME_WEB)
-        bToken = self.fAbs.getToken(self.user, TokenType.BULLET)
-        
         header = {
-            'Authorization':    f'Bearer {bToken.value}',
-            'Accept-Language':  self.user.language,
-            'User-Agent':       "Mozilla/5.0 (Linux; Android 11; Pixel 5) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/94.0.4606.61 Mobile Safari/537.36",
-            'X-Web-View-Ver':   self.vManager.getAppVersions().s3Version,
-            'Content-Type':     'application/json',
-            'Accept':           '*/*',
-            'Origin':           self.GRAPHQL_ENDPOINT,
-            'X-Requested-With': 'com.nintendo.znca',
-            'Referer':          f'{self.GRAPHQL_ENDPOINT}?lang={self.user.language}',
-            'Accept-Encoding':  'gzip, deflate'
+            **self.BASE_HEADERS,
+            'Authorization':    f'Bearer {tokens.bullet.value}',
+            'Accept-Language':  tokens.language,
+            'X-Web-View-Ver':   VersionManager.registry().versions.s3Version,
+            'Referer':          f'{self.GRAPHQL_ENDPOINT}?lang={tokens.language}'
         }
 
-        body = {
-            "variables": kwargs,
-            "extensions": {
-              "persistedQuery": {
-                "version": 1,
-                "sha256Hash": self.fAbs.getHashFromName(self.queryName)
-              }
-            }
-        }
+        body = query.buildBody(variables)
 
         cookies = {
-        	'_gtoken': gToken.value,
+        	'_gtoken': tokens.gameWeb.value,
         	'_dnt':    '1'
         }
 
         try:
-            r = post(self.GRAPHQL_ENDPOINT, headers=header, json=body, cookies=cookies)
+            r = await HTTPClient.post(self.GRAPHQL_ENDPOINT, headers=header, data=body, cookies=cookies)
             
-            if r.status_code != 200:
-                if not await RefreshManager.refreshGameWeb(self.dbSession, self.user):
-                    self.logger.warn(f"Failed to refresh tokens after initial failure for User {self.user.discordID}")
-                    return False
+            if r.status != 200:
+                if not await RefreshManager.refreshGameWeb(self.dbSessions, tokens.userID):
+                    self.logger.warn(f"Failed to refresh tokens after initial failure for User {tokens.discordID}")
+                    return None
                 else:
-                    self.logger.log(f"Refreshed tokens after initial failure for User {self.user.discordID}")
+                    self.logger.log(f"Refreshed tokens after initial failure for User {tokens.discordID}")
                 
-                header['Authorization'] = f'Bearer {self.fAbs.getToken(self.user, TokenType.BULLET).value}'
-                cookies['_gtoken'] = self.fAbs.getToken(self.user, TokenType.GAME_WEB).value
+                tokens = await self.__reloadTokens()
+                header['Authorization'] = f'Bearer {tokens.bullet.value}'
+                cookies['_gtoken'] = tokens.gameWeb.value
                 
-                r = post(self.GRAPHQL_ENDPOINT, headers=header, json=body, cookies=cookies)
+                r = await HTTPClient.post(self.GRAPHQL_ENDPOINT, headers=header, data=body, cookies=cookies)
                 
-                if r.status_code != 200:
-                    self.logger.warn(f"Second request failed after successful token refresh for User {self.user.discordID}!")
-                    return False
+                if r.status != 200:
+                    self.logger.warn(f"Second request failed after successful token refresh for User {tokens.discordID}!")
+                    return None
 
-            self.gqlResult = loads(r.text)
+            result, size = (loads(r.text), 0) if paged else self.__decode(r.text)
+
+            # A 200 can still carry GraphQL errors without data, which must not be cached.
+            if result.get("errors") or result.get("data") is None:
+                self.logger.warn(f"GraphQL errors with User {tokens.discordID} -> {result.get('errors')}")
+                return None
         except Exception as ex:
-            self.logger.warn(f"Get failure with User {self.user.discordID} -> {str(ex)}")
-            return False
-        
-        return True
+            self.logger.warn(f"Get failure with User {tokens.discordID} -> {str(ex)}")
+            return None
+
+        ttl = self.cacheTTL()
+        if ttl > 0 and not paged:
+            GQLResponseCache.put(key, result, size, ttl, self.STALE_TTL)
+        return result
+
+
+    def __decode(self, text: str) -> tuple[dict, int]:
+        """ Internal helper that decodes a response, stopping early when STREAM_PATH is set.
+            Returns the result with the size to charge it in the response cache. A streamed
+            result is charged for the text up to the last node it kept, as the rest is not retained. """
+        if self.STREAM_PATH is None:
+            return loads(text), len(text)
+
+        # Raises ValueError on a response without the array, e.g. an error response,
+        # which fails the request rather than caching a result of another shape.
+        nodes = []
+        size = 0
+        for rawNode, end in iterArray(text, self.STREAM_PATH):
+            try:
+                node = self.decodeNode(rawNode)
+            except (KeyError, TypeError) as ex:
+                self.logger.warn(f"Skipped a node of {self.queryName} that failed to decode -> {str(ex)}")
+                continue
+
+            if not self.keepParsing(node):
+                break
+            nodes.append(node)
+            size = end
+
+        result = nodes
+        for key in reversed(self.STREAM_PATH):
+            result = {key: result}
+        return result, size
+
+
+    def __scope(self) -> int|None:
+        """ Internal helper returning who the response belongs to, None if it is shared by every User. """
+        return None if self.GLOBAL_SCOPE else self.tokens.userID
+
+
+    async def __reloadTokens(self) -> TokenSet:
+        """ Internal helper that re-reads the User's tokens after a refresh. """
+        async with self.dbSessions() as dbSession:
+            self.tokens = await FindAbstractor(dbSession).getTokenSet(self.tokens.userID)
+        return self.tokens
@@ -0,0 +1,71 @@
+from sqlalchemy import select, bindparam
+from time import time
+from typing import AsyncIterator
+
+from Database.Models import Token, TokenType, TokenSet
+from Database.Ext import FindAbstractor
+from Database.Engine import SessionFactory
+from NSOAuth.GraphQL.GQLRequest import GQLRequest
+from Config import GLOBAL_QUERY
+
+
+class GlobalQuery:
+    """ Sends GLOBAL_SCOPE requests with the tokens of any healthy User.
+
+        The last User that worked is reused, a User whose request failed is
+        skipped for GLOBAL_QUERY.UNHEALTHY_COOLDOWN seconds. """
+
+    # Users whose Bullet Token is valid for a while, longest lived first.
+    __CANDIDATES = select(Token.userID).where(Token.type == TokenType.BULLET) \
+                                       .where(Token.expiresAt > bindparam("validUntil")) \
+                                       .order_by(Token.expiresAt.desc()).limit(GLOBAL_QUERY.MAX_ATTEMPTS * 4)
+
+    __lastHealthy: int|None = None
+    __unhealthyUntil: dict[int, float] = {}
+
+
+    @staticmethod
+    async def send(dbSessions: SessionFactory, requestType: type[GQLRequest], **kwargs) -> GQLRequest|None:
+        """ Send a GLOBAL_SCOPE request, trying other Users if it fails.
+            Returns the request holding the result, or None if every attempt failed. """
+        attempts = 0
+        async for tokens in __class__.__pickTokens(dbSessions):
+            if attempts == GLOBAL_QUERY.MAX_ATTEMPTS:
+                break
+            attempts += 1
+
+            request = requestType(dbSessions, tokens)
+            if await request.sendGQLRequest(**kwargs):
+                __class__.__lastHealthy = tokens.userID
+                return request
+
+            __class__.__unhealthyUntil[tokens.userID] = time() + GLOBAL_QUERY.UNHEALTHY_COOLDOWN
+            if __class__.__lastHealthy == tokens.userID:
+                __class__.__lastHealthy = None
+
+        return None
+
+
+    @staticmethod
+    async def __pickTokens(dbSessions: SessionFactory) -> AsyncIterator[TokenSet]:
+        """ Internal helper yielding the tokens of healthy Users, the last one that worked first.
+            The database is only queried for others once that User fails. """
+        lastHealthy = __class__.__lastHealthy
+        if lastHealthy is not None:
+            async with dbSessions() as session:
+                tokens = (await FindAbstractor(session).getTokenSets([lastHealthy])).get(lastHealthy)
+            if tokens is not None and not tokens.bullet.isExpired():
+                yield tokens
+
+        now = time()
+        async with dbSessions() as session:
+            userIDs = await session.scalars(__class__.__CANDIDATES, {"validUntil": int(now) + GLOBAL_QUERY.MIN_VALIDITY})
+            userIDs = [
+                userID for userID in userIDs
+                if userID != lastHealthy and __class__.__unhealthyUntil.get(userID, 0) <= now
+            ]
+            tokenSets = await FindAbstractor(session).getTokenSets(userIDs)
+
+        for userID in userIDs:
+            if userID in tokenSets:
+                yield tokenSets[userID]
@@ -0,0 +1,20 @@
+from dataclasses import dataclass
+from json import dumps
+
+
+@dataclass(frozen=True, slots=True)
+class PersistedQuery:
+    """ A SplatNet3 persisted query with its request body prepared ahead of time. """
+    name: str
+    sha256Hash: str
+    bodySuffix: str
+
+    @staticmethod
+    def fromHash(name: str, sha256Hash: str) -> "PersistedQuery":
+        """ Build a query, encoding the part of the body that never changes. """
+        extensions = dumps({"persistedQuery": {"version": 1, "sha256Hash": sha256Hash}})
+        return PersistedQuery(name, sha256Hash, f', "extensions": {extensions}}}')
+
+    def buildBody(self, variables: dict) -> str:
+        """ Return the JSON request body for the given variables. """
+        return f'{{"variables": {dumps(variables)}{self.bodySuffix}'
@@ -0,0 +1,47 @@
+from functools import wraps
+from typing import Awaitable, Callable, Protocol, TypeVar
+
+from Database.Models import TokenSet
+from Database.Engine import SessionFactory
+from NSOAuth.GraphQL.GQLRequest import GQLRequest
+
+
+T = TypeVar("T", covariant=True)
+
+
+class QueryCall(Protocol[T]):
+    """ Sends a persisted query, returning its decoded result or None if the request failed. """
+    queryName: str
+    requestType: type[GQLRequest]
+
+    async def __call__(self, dbSessions: SessionFactory, tokens: TokenSet, **variables) -> T|None: ...
+
+
+def persistedQuery(name: str, cacheTTL: int = 0, staleTTL: int = 0) -> Callable[[Callable[[dict], T]], QueryCall[T]]:
+    """ Turn a decoder of a persisted query's result into a callable that sends the query.
+
+        `name` is the query's key in the GraphQL hash map. The hash and body template
+        are resolved from the VersionManager registry, so only the decoder is needed:
+
+            @persistedQuery("HomeQuery", cacheTTL=60)
+            def homeQuery(result: dict) -> Home: ... """
+    def wrap(decoder: Callable[[dict], T]) -> QueryCall[T]:
+        requestType = type(name, (GQLRequest,), {
+            "queryName":  name,
+            "loggerName": name,
+            "CACHE_TTL":  cacheTTL,
+            "STALE_TTL":  staleTTL
+        })
+
+        @wraps(decoder)
+        async def send(dbSessions: SessionFactory, tokens: TokenSet, **variables) -> T|None:
+            request = requestType(dbSessions, tokens)
+            if not await request.sendGQLRequest(**variables):
+                return None
+            return decoder(request.gqlResult)
+
+        send.queryName = name
+        send.requestType = requestType
+        return send
+
+    return wrap
@@ -0,0 +1,89 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from time import time
+
+from Config import GQL_CACHE
+
+
+@dataclass(slots=True)
+class CachedResponse:
+    result: dict
+    size: int
+    freshUntil: float
+    staleUntil: float
+
+    def isFresh(self) -> bool:
+        """ Returns a bool if the response can be served without revalidating. """
+        return time() < self.freshUntil
+
+    def isUsable(self) -> bool:
+        """ Returns a bool if the response can still be served while revalidating. """
+        return time() < self.staleUntil
+
+
+class GQLResponseCache:
+    """ LRU cache of parsed GraphQL responses keyed by (User ID, query name, variables).
+
+        The total size of the raw responses is kept under GQL_CACHE.MAX_BYTES.
+        Cached results are shared between callers and must not be modified. """
+
+    __entries: OrderedDict[tuple, CachedResponse] = OrderedDict()
+    __totalSize: int = 0
+
+    hits: int = 0
+    staleHits: int = 0
+    misses: int = 0
+
+
+    @staticmethod
+    def get(key: tuple) -> CachedResponse|None:
+        """ Return the cached response for a key if it is still usable. """
+        entry = __class__.__entries.get(key)
+        if entry is None or not entry.isUsable():
+            if entry is not None:
+                __class__.__remove(key)
+            __class__.misses += 1
+            return None
+
+        __class__.__entries.move_to_end(key)
+        if entry.isFresh():
+            __class__.hits += 1
+        else:
+            __class__.staleHits += 1
+        return entry
+
+
+    @staticmethod
+    def put(key: tuple, result: dict, size: int, ttl: int, staleTTL: int) -> None:
+        """ Store a response, evicting the least recently used entries past the memory budget. """
+        if size > GQL_CACHE.MAX_BYTES:
+            return
+
+        __class__.__remove(key)
+
+        now = time()
+        __class__.__entries[key] = CachedResponse(result, size, now + ttl, now + ttl + staleTTL)
+        __class__.__totalSize += size
+
+        while __class__.__totalSize > GQL_CACHE.MAX_BYTES:
+            __class__.__remove(next(iter(__class__.__entries)))
+
+
+    @staticmethod
+    def size() -> int:
+        """ Return the number of cached entries. """
+        return len(__class__.__entries)
+
+
+    @staticmethod
+    def totalSize() -> int:
+        """ Return the size in bytes of every cached response. """
+        return __class__.__totalSize
+
+
+    @staticmethod
+    def __remove(key: tuple) -> None:
+        """ Internal helper that drops an entry and releases its size. """
+        entry = __class__.__entries.pop(key, None)
+        if entry is not None:
+            __class__.__totalSize -= entry.size
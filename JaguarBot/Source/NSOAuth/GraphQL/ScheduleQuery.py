@@ -0,0 +1,118 @@
+from asyncio import Task, create_task, sleep
+from dataclasses import dataclass
+from datetime import datetime
+from time import time
+
+from Database.Models import TokenSet
+from Database.Engine import SessionFactory
+from Helpers.Logger import Logger
+from NSOAuth.GraphQL.GQLRequest import GQLRequest
+from NSOAuth.GraphQL.GlobalQuery import GlobalQuery
+from Config import GLOBAL_QUERY
+
+
+@dataclass(frozen=True, slots=True)
+class Rotation:
+    startTime: int
+    endTime: int
+    rule: str
+    stages: tuple[str, ...]
+
+
+class ScheduleQuery(GQLRequest):
+    """ The stage schedules, which are the same for every User. """
+
+    GLOBAL_SCOPE = True
+    ROTATION = 7200     # VS schedules change every 2 hours, on even UTC hours.
+
+    __rotationTask: Task|None = None
+
+    def __init__(self, dbSessions: SessionFactory, tokens: TokenSet) -> None:
+        self.queryName = "StageScheduleQuery"
+        self.loggerName = __class__.__name__
+
+        super().__init__(dbSessions, tokens)
+
+    @staticmethod
+    def nextRotation(now: float) -> int:
+        """ Returns when the rotation after `now` starts. """
+        return (int(now) // __class__.ROTATION + 1) * __class__.ROTATION
+
+    @staticmethod
+    def startRotation(dbSessions: SessionFactory) -> None:
+        """ Refresh the schedules in the background just after every rotation. """
+        if __class__.__rotationTask is None:
+            __class__.__rotationTask = create_task(__class__.__rotationLoop(dbSessions))
+
+    @staticmethod
+    def stopRotation() -> None:
+        """ Stop refreshing the schedules. """
+        if __class__.__rotationTask is not None:
+            __class__.__rotationTask.cancel()
+            __class__.__rotationTask = None
+
+    @staticmethod
+    async def __rotationLoop(dbSessions: SessionFactory) -> None:
+        """ Internal loop that fetches the schedules once per rotation. """
+        logger = Logger(__class__.__name__)
+        while True:
+            try:
+                if await GlobalQuery.send(dbSessions, __class__) is None:
+                    logger.warn("Failed to refresh the schedules.")
+            except Exception as ex:
+                logger.warn(f"Failed to refresh the schedules -> {str(ex)}")
+
+            # One second late, so the cached schedule has certainly expired.
+            now = time()
+            await sleep(__class__.nextRotation(now) + GLOBAL_QUERY.ROTATION_DELAY + 1 - now)
+
+    def cacheTTL(self) -> int:
+        """ Fresh until shortly after the next rotation, once SplatNet3 has published it. """
+        now = time()
+        return int(self.nextRotation(now) + GLOBAL_QUERY.ROTATION_DELAY - now)
+
+    def getRegular(self) -> list[Rotation]:
+        """ Returns the Turf War rotations. """
+        return self.__decode("regularSchedules", lambda node: [node["regularMatchSetting"]])
+
+    def getAnarchy(self, bankaraMode: str) -> list[Rotation]:
+        """ Returns the Anarchy rotations of "CHALLENGE" (Series) or "OPEN". """
+        return self.__decode("bankaraSchedules", lambda node: [
+            setting for setting in node["bankaraMatchSettings"] or [] if setting["bankaraMode"] == bankaraMode
+        ])
+
+    def getXBattle(self) -> list[Rotation]:
+        """ Returns the X Battle rotations. """
+        return self.__decode("xSchedules", lambda node: [node["xMatchSetting"]])
+
+    def getSalmonRun(self) -> list[Rotation]:
+        """ Returns the Salmon Run rotations, their rule is the supplied weapons. """
+        nodes = self.gqlResult["data"]["coopGroupingSchedule"]["regularSchedules"]["nodes"]
+        return [
+            Rotation(
+                self.__timestamp(node["startTime"]),
+                self.__timestamp(node["endTime"]),
+                " / ".join(weapon["name"] for weapon in node["setting"]["weapons"]),
+                (node["setting"]["coopStage"]["name"],)
+            )
+            for node in nodes if node["setting"]
+        ]
+
+    def __decode(self, scheduleName: str, getSettings) -> list[Rotation]:
+        """ Internal helper that decodes the VS rotations of a schedule, skipping Splatfest gaps. """
+        rotations = []
+        for node in self.gqlResult["data"][scheduleName]["nodes"]:
+            for setting in getSettings(node):
+                if setting:
+                    rotations.append(Rotation(
+                        self.__timestamp(node["startTime"]),
+                        self.__timestamp(node["endTime"]),
+                        setting["vsRule"]["name"],
+                        tuple(stage["name"] for stage in setting["vsStages"])
+                    ))
+        return rotations
+
+    @staticmethod
+    def __timestamp(isoTime: str) -> int:
+        """ Internal helper converting a SplatNet3 time to a UNIX timestamp. """
+        return int(datetime.fromisoformat(isoTime.replace("Z", "+00:00")).timestamp())
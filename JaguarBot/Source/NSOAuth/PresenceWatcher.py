@@ -0,0 +1,220 @@
+from discord import Bot, Embed, Colour
+from sqlalchemy import select
+from asyncio import Event, Semaphore, Task, TimeoutError, create_task, wait_for
+from heapq import heappush, heappop
+from time import time
+
+from Database.Models import PresenceSubscription
+from Database.Ext import FindAbstractor
+from Database.Engine import SessionFactory
+from Helpers.Logger import Logger
+from NSOAuth.GraphQL.FriendListQuery import FriendListQuery
+from NSOAuth.GraphQL.Friend import Friend, FriendMode
+from Commands.SplatNet3.Render import friendField
+from Config import PRESENCE, INFO_EMBED_COLOR
+
+
+class PresenceWatcher:
+    """ Polls the friend lists of subscribed Users and messages them when a friend starts playing.
+
+        Users are polled more often while any of their friends are playing. A friend is
+        announced when they start playing or switch modes. The last announced mode is kept
+        per friend, as friend ID -> (mode, last seen playing), so going between matchmaking
+        and a match, or back to the lobby for a while, is not announced again. """
+
+    __heap: list[tuple[float, int]] = []
+    __dueAt: dict[int, float] = {}
+    __announced: dict[int, dict[str, tuple[FriendMode, float]]] = {}
+    __failures: dict[int, int] = {}
+    __polls: set[Task] = set()
+    __wakeup: Event|None = None
+    __limit: Semaphore|None = None
+    __task: Task|None = None
+    __bot: Bot|None = None
+    __logger = Logger("PresenceWatcher")
+
+
+    @staticmethod
+    async def start(bot: Bot, dbSessions: SessionFactory) -> None:
+        """ Load every subscription from the database and start polling. """
+        if __class__.__task is not None:
+            return
+
+        __class__.__bot = bot
+        __class__.__wakeup = Event()
+        __class__.__limit = Semaphore(PRESENCE.WORKERS)
+
+        async with dbSessions() as session:
+            for userID in await session.scalars(select(PresenceSubscription.userID)):
+                __class__.subscribe(userID)
+
+        __class__.__logger.log(f"Watching {len(__class__.__dueAt)} subscribers.")
+        __class__.__task = create_task(__class__.__run(dbSessions))
+
+
+    @staticmethod
+    def stop() -> None:
+        """ Stop polling. """
+        if __class__.__task is not None:
+            __class__.__task.cancel()
+            __class__.__task = None
+
+
+    @staticmethod
+    def subscribe(userID: int) -> None:
+        """ Start watching a User. The first poll only records their friends' state. """
+        __class__.__schedule(userID, time())
+
+
+    @staticmethod
+    def unsubscribe(userID: int) -> None:
+        """ Stop watching a User and forget which friends were announced. """
+        __class__.__dueAt.pop(userID, None)
+        __class__.__announced.pop(userID, None)
+        __class__.__failures.pop(userID, None)
+
+
+    @staticmethod
+    def subscriberCount() -> int:
+        """ Return the number of watched Users. """
+        return len(__class__.__dueAt)
+
+
+    @staticmethod
+    def __schedule(userID: int, dueAt: float) -> None:
+        """ Internal helper that queues the next poll of a User. """
+        __class__.__dueAt[userID] = dueAt
+        heappush(__class__.__heap, (dueAt, userID))
+
+        if __class__.__wakeup is not None:
+            __class__.__wakeup.set()
+
+
+    @staticmethod
+    async def __run(dbSessions: SessionFactory) -> None:
+        """ Internal loop that waits for the next due poll and dispatches it to a worker. """
+        heap = __class__.__heap
+
+        while True:
+            # Drop entries that were rescheduled or unsubscribed.
+            while heap and __class__.__dueAt.get(heap[0][1]) != heap[0][0]:
+                heappop(heap)
+
+            __class__.__wakeup.clear()
+
+            if not heap:
+                await __class__.__wakeup.wait()
+                continue
+
+            delay = heap[0][0] - time()
+            if delay > 0:
+                try:
+                    await wait_for(__class__.__wakeup.wait(), delay)
+                except TimeoutError:
+                    pass
+                continue
+
+            _, userID = heappop(heap)
+
+            await __class__.__limit.acquire()
+            task = create_task(__class__.__poll(dbSessions, userID))
+            __class__.__polls.add(task)
+            task.add_done_callback(__class__.__polls.discard)
+
+
+    @staticmethod
+    async def __poll(dbSessions: SessionFactory, userID: int) -> None:
+        """ Internal helper that polls one User and queues their next poll. """
+        try:
+            async with dbSessions() as session:
+                tokens = (await FindAbstractor(session).getTokenSets([userID])).get(userID)
+
+            if tokens is None:
+                __class__.unsubscribe(userID)
+                return
+
+            query = FriendListQuery(dbSessions, tokens)
+            query.serveStale = False
+
+            if not await query.sendGQLRequest():
+                __class__.__backoff(userID)
+                return
+
+            playing = query.getAllPlayingFriends()
+
+            if userID not in __class__.__dueAt:
+                return   # Unsubscribed while polling.
+
+            __class__.__failures.pop(userID, None)
+
+            # The first poll only records what is already being played.
+            firstPoll = userID not in __class__.__announced
+            changed = __class__.__updateAnnounced(__class__.__announced.setdefault(userID, {}), playing)
+            if changed and not firstPoll:
+                await __class__.__notify(tokens.discordID, changed)
+
+            interval = PRESENCE.ACTIVE_INTERVAL if playing else PRESENCE.IDLE_INTERVAL
+            __class__.__schedule(userID, time() + interval)
+
+        except Exception as ex:
+            __class__.__logger.warn(f"Poll of User {userID} raised -> {str(ex)}")
+            __class__.__backoff(userID)
+        finally:
+            __class__.__limit.release()
+
+
+    @staticmethod
+    def __updateAnnounced(announced: dict[str, tuple[FriendMode, float]], playing: list[Friend]) -> list[Friend]:
+        """ Internal helper returning the friends that started playing or switched modes,
+            and recording them as announced. Friends that stopped playing for longer than
+            PRESENCE.RENOTIFY_AFTER are forgotten. """
+        now = time()
+        changed = []
+        for friend in playing:
+            if friend.mode == FriendMode.NONE:
+                continue
+
+            previous = announced.get(friend.id)
+            if previous is None or previous[0] != friend.mode:
+                changed.append(friend)
+            announced[friend.id] = (friend.mode, now)
+
+        for friendID in [friendID for friendID, (_, seenAt) in announced.items() if seenAt < now - PRESENCE.RENOTIFY_AFTER]:
+            del announced[friendID]
+
+        return changed
+
+
+    @staticmethod
+    def __backoff(userID: int) -> None:
+        """ Internal helper that delays the next poll of a failing User exponentially. """
+        if userID not in __class__.__dueAt:
+            return
+
+        failures = __class__.__failures.get(userID, 0) + 1
+        __class__.__failures[userID] = failures
+
+        delay = min(PRESENCE.IDLE_INTERVAL * 2 ** (failures - 1), PRESENCE.MAX_BACKOFF)
+        __class__.__schedule(userID, time() + delay)
+
+
+    @staticmethod
+    async def __notify(discordID: int, friends: list[Friend]) -> None:
+        """ Internal helper that messages a User about friends that started playing something new. """
+        fields = [field for field in map(friendField, friends) if field is not None]
+        if not fields:
+            return
+
+        bot = __class__.__bot
+        try:
+            user = bot.get_user(discordID) or await bot.fetch_user(discordID)
+
+            await user.send(embed=Embed(
+                title  = "Your friends just started playing",
+                color  = Colour.from_rgb(*INFO_EMBED_COLOR),
+                fields = fields[0:FriendListQuery.MAX_PLAYERS]
+            ))
+        except Exception as ex:
+            # Usually closed direct messages, which should not slow down polling.
+            __class__.__logger.warn(f"Failed to message Discord User {discordID} -> {str(ex)}")
+
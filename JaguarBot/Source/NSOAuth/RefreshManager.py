@@ -1,64 +1,122 @@
-from sqlalchemy.orm import Session
-from time import time
+from asyncio import Task, create_task, shield
+from typing import Awaitable, Callable
 
 from Database.Models import User, TokenType
 from Database.Ext import FindAbstractor
-from NSOAuth.VersionManager import VersionManager
+from Database.Cache import TokenSetCache
+from Database.Engine import SessionFactory
 from NSOAuth.TokenManager import TokenManager, Status
-from Config import EXP_OFFSET
 
 class RefreshManager:
     """ Refresh expired tokens. """
 
+    # In-flight refreshes keyed by User ID -> (TokenType refreshed, Task).
+    __inFlight: dict[int, tuple[TokenType, Task]] = {}
+
+
     @staticmethod
-    async def refreshGameWeb(dbSession: Session, user: User) -> bool:
+    async def refreshGameWeb(dbSessions: SessionFactory, userID: int) -> bool:
         """ Refresh the GameWeb token and any tokens afterwards. """
-        tkManager = TokenManager(VersionManager(dbSession).getAppVersions())
-        fAbs = FindAbstractor(dbSession)
+        return await __class__.__singleFlight(
+            userID, TokenType.GAME_WEB,
+            lambda: __class__.__refreshGameWeb(dbSessions, userID)
+        )
 
-        sessionToken = fAbs.getToken(user, TokenType.SESSION).value
-        gToken = await tkManager.generateGToken(sessionToken)
 
-        if gToken.result.status != Status.OK:
-            return False
-        
-        bToken = await tkManager.generateBulletToken(sessionToken, gToken.value)
+    @staticmethod
+    async def refreshBullet(dbSessions: SessionFactory, userID: int) -> bool:
+        """ Refresh the Bullet Token. """
+        return await __class__.__singleFlight(
+            userID, TokenType.BULLET,
+            lambda: __class__.__refreshBullet(dbSessions, userID)
+        )
 
-        if bToken.result.status != Status.OK:
+
+    @staticmethod
+    async def __singleFlight(userID: int, tokenType: TokenType, refresh: Callable[[], Awaitable[bool]]) -> bool:
+        """ Internal helper that lets concurrent callers share one refresh per User.
+
+            A running GameWeb refresh also replaces the Bullet token, so it satisfies
+            both kinds of request. A running Bullet refresh is awaited before a GameWeb
+            refresh is started. Each refresh commits through its own session, so
+            callers should re-read their tokens afterwards. """
+
+        while (entry := __class__.__inFlight.get(userID)) is not None:
+            runningType, task = entry
+            result = await shield(task)
+
+            if runningType == TokenType.GAME_WEB or runningType == tokenType:
+                return result
+
+        task = create_task(refresh())
+        __class__.__inFlight[userID] = (tokenType, task)
+        task.add_done_callback(lambda done: __class__.__release(userID, done))
+
+        return await shield(task)
+
+
+    @staticmethod
+    def __release(userID: int, task: Task) -> None:
+        """ Internal helper that clears a finished refresh from the registry. """
+        entry = __class__.__inFlight.get(userID)
+        if entry is not None and entry[1] is task:
+            del __class__.__inFlight[userID]
+
+
+    @staticmethod
+    async def __refreshGameWeb(dbSessions: SessionFactory, userID: int) -> bool:
+        """ Internal helper that performs the GameWeb and Bullet refresh. """
+        tkManager = TokenManager()
+
+        async with dbSessions() as dbSession:
+            tokens = await FindAbstractor(dbSession).getTokenSet(userID)
+
+        chain = await tkManager.runRefreshChain(tokens.session.value)
+
+        if chain.result.status != Status.OK:
             return False
-        
-        userGTokenObj = fAbs.getToken(user, TokenType.GAME_WEB)
-        userBTokenObj = fAbs.getToken(user, TokenType.BULLET)
 
-        userGTokenObj.value = gToken.value
-        userBTokenObj.value = bToken.value
+        async with dbSessions() as dbSession:
+            user = await dbSession.get(User, userID)
+            fAbs = FindAbstractor(dbSession)
+
+            userGTokenObj = await fAbs.getToken(user, TokenType.GAME_WEB)
+            userBTokenObj = await fAbs.getToken(user, TokenType.BULLET)
+
+            userGTokenObj.value = chain.gToken
+            userBTokenObj.value = chain.bulletToken
 
-        userGTokenObj.expiresAt = int(time() + EXP_OFFSET.GTOKEN)
-        userBTokenObj.expiresAt = int(time() + EXP_OFFSET.BULLET)
-        
-        dbSession.commit()
+            userGTokenObj.expiresAt = chain.gTokenExpiresAt
+            userBTokenObj.expiresAt = chain.bulletTokenExpiresAt
+
+            await dbSession.commit()
+
+        TokenSetCache.invalidate(userID=userID)
 
         return True
-    
+
 
     @staticmethod
-    async def refreshBullet(dbSession: Session, user: User) -> bool:
-        """ Refresh the Bullet Token. """
-        tkManager = TokenManager(VersionManager(dbSession).getAppVersions())
-        fAbs = FindAbstractor(dbSession)
+    async def __refreshBullet(dbSessions: SessionFactory, userID: int) -> bool:
+        """ Internal helper that performs the Bullet refresh. """
+        tkManager = TokenManager()
 
-        sessionToken = fAbs.getToken(user, TokenType.SESSION).value
-        gToken =       fAbs.getToken(user, TokenType.GAME_WEB).value
-        
-        bToken = await tkManager.generateBulletToken(sessionToken, gToken)
+        async with dbSessions() as dbSession:
+            tokens = await FindAbstractor(dbSession).getTokenSet(userID)
+
+        bToken = await tkManager.generateBulletToken(tokens.session.value, tokens.gameWeb.value)
 
         if bToken.result.status != Status.OK:
             return False
-        
-        userBTokenObj = fAbs.getToken(user, TokenType.BULLET)
 
-        userBTokenObj.value = bToken.value
-        userBTokenObj.expiresAt = int(time() + EXP_OFFSET.BULLET)
-        dbSession.commit()
+        async with dbSessions() as dbSession:
+            user = await dbSession.get(User, userID)
+            userBTokenObj = await FindAbstractor(dbSession).getToken(user, TokenType.BULLET)
+
+            userBTokenObj.value = bToken.value
+            userBTokenObj.expiresAt = bToken.expiresAt
+            await dbSession.commit()
 
-        return True
\ No newline at end of file
+        TokenSetCache.invalidate(userID=userID)
+
+        return True
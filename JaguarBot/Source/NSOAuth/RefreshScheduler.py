@@ -0,0 +1,184 @@
+from sqlalchemy import select
+from asyncio import Event, Semaphore, Task, TimeoutError, create_task, wait_for
+from dataclasses import dataclass
+from heapq import heappush, heappop
+from random import uniform
+from time import time
+
+from Database.Models import Token, TokenType
+from Database.Ext import FindAbstractor
+from Database.Engine import SessionFactory
+from Helpers.Logger import Logger
+from NSOAuth.RefreshManager import RefreshManager
+from Config import REFRESH
+
+
+@dataclass
+class ScheduledRefresh:
+    deadline: float
+    userID: int
+    tokenType: TokenType
+
+
+class RefreshScheduler:
+    """ Proactively refresh GameWeb and Bullet tokens before they expire. """
+
+    SCHEDULED_TYPES = (TokenType.GAME_WEB, TokenType.BULLET)
+
+    __heap: list[tuple[float, int, TokenType]] = []
+    __deadlines: dict[tuple[int, TokenType], float] = {}
+    __wakeup: Event|None = None
+    __limit: Semaphore|None = None
+    __task: Task|None = None
+    __refreshTasks: set[Task] = set()
+    __failures: dict[tuple[int, TokenType], int] = {}
+    __running: int = 0
+    __logger = Logger("RefreshScheduler")
+
+
+    @staticmethod
+    async def start(dbSessions: SessionFactory) -> None:
+        """ Load every volatile token from the database and start the scheduler. """
+        if __class__.__task is not None:
+            return
+
+        __class__.__wakeup = Event()
+        __class__.__limit = Semaphore(REFRESH.CONCURRENCY)
+
+        async with dbSessions() as session:
+            stmt = select(Token).where(Token.type.in_(__class__.SCHEDULED_TYPES))
+            for token in await session.scalars(stmt):
+                __class__.schedule(token.userID, TokenType(token.type), token.expiresAt)
+
+        __class__.__logger.log(f"Scheduled {len(__class__.__deadlines)} token refreshes.")
+        __class__.__task = create_task(__class__.__run(dbSessions))
+
+
+    @staticmethod
+    def stop() -> None:
+        """ Stop scheduling new refreshes. """
+        if __class__.__task is not None:
+            __class__.__task.cancel()
+            __class__.__task = None
+
+
+    @staticmethod
+    def schedule(userID: int, tokenType: TokenType, expiresAt: int) -> None:
+        """ Queue a token to be refreshed the configured lead time before it expires.
+            Replaces any refresh already queued for the same token. """
+        deadline = expiresAt - REFRESH.LEAD_TIME - uniform(0, REFRESH.JITTER)
+
+        __class__.__deadlines[(userID, tokenType)] = deadline
+        heappush(__class__.__heap, (deadline, userID, tokenType))
+
+        if __class__.__wakeup is not None:
+            __class__.__wakeup.set()
+
+
+    @staticmethod
+    def queueDepth() -> int:
+        """ Return the number of tokens waiting to be refreshed. """
+        return len(__class__.__deadlines)
+
+
+    @staticmethod
+    def runningCount() -> int:
+        """ Return the number of refreshes currently in progress. """
+        return __class__.__running
+
+
+    @staticmethod
+    def nextRefreshes(count: int) -> list[ScheduledRefresh]:
+        """ Return the next `count` queued refreshes, soonest first. """
+        upcoming = sorted((deadline, key) for key, deadline in __class__.__deadlines.items())
+        return [ScheduledRefresh(deadline, userID, tokenType) for deadline, (userID, tokenType) in upcoming[:count]]
+
+
+    @staticmethod
+    async def __run(dbSessions: SessionFactory) -> None:
+        """ Internal loop that waits for the next deadline and dispatches refreshes. """
+        heap = __class__.__heap
+
+        while True:
+            # Drop entries that were replaced by a later call to schedule.
+            while heap and __class__.__deadlines.get((heap[0][1], heap[0][2])) != heap[0][0]:
+                heappop(heap)
+
+            __class__.__wakeup.clear()
+
+            if not heap:
+                await __class__.__wakeup.wait()
+                continue
+
+            delay = heap[0][0] - time()
+            if delay > 0:
+                try:
+                    await wait_for(__class__.__wakeup.wait(), delay)
+                except TimeoutError:
+                    pass
+                continue
+
+            _, userID, tokenType = heappop(heap)
+            del __class__.__deadlines[(userID, tokenType)]
+
+            await __class__.__limit.acquire()
+            task = create_task(__class__.__refresh(dbSessions, userID, tokenType))
+            __class__.__refreshTasks.add(task)
+            task.add_done_callback(__class__.__refreshTasks.discard)
+
+
+    @staticmethod
+    async def __refresh(dbSessions: SessionFactory, userID: int, tokenType: TokenType) -> None:
+        """ Internal helper that refreshes a single token and queues its next refresh. """
+        __class__.__running += 1
+        try:
+            async with dbSessions() as session:
+                tokens = (await FindAbstractor(session).getTokenSets([userID])).get(userID)
+
+            if tokens is None:
+                return
+
+            token = tokens.getToken(tokenType)
+
+            # Already refreshed elsewhere, e.g. lazily by a GraphQL request.
+            if token.expiresAt - REFRESH.LEAD_TIME > time():
+                __class__.__failures.pop((userID, tokenType), None)
+                __class__.schedule(userID, tokenType, token.expiresAt)
+                return
+
+            if tokenType == TokenType.BULLET:
+                success = await RefreshManager.refreshBullet(dbSessions, userID) \
+                          or await RefreshManager.refreshGameWeb(dbSessions, userID)
+            else:
+                success = await RefreshManager.refreshGameWeb(dbSessions, userID)
+
+            if not success:
+                delay = __class__.__retry(userID, tokenType)
+                __class__.__logger.warn(f"Failed to refresh {tokenType.name} token for User {tokens.discordID}, retrying in {delay}s.")
+                return
+
+            async with dbSessions() as session:
+                tokens = await FindAbstractor(session).getTokenSet(userID)
+
+            for refreshedType in __class__.SCHEDULED_TYPES:
+                __class__.__failures.pop((userID, refreshedType), None)
+                __class__.schedule(userID, refreshedType, tokens.getToken(refreshedType).expiresAt)
+
+        except Exception as ex:
+            __class__.__logger.warn(f"Refresh of {tokenType.name} token for User {userID} raised -> {str(ex)}")
+            __class__.__retry(userID, tokenType)
+        finally:
+            __class__.__running -= 1
+            __class__.__limit.release()
+
+
+    @staticmethod
+    def __retry(userID: int, tokenType: TokenType) -> int:
+        """ Internal helper that queues a failed refresh to run again, backing off while it keeps failing.
+            Returns the delay in seconds. """
+        failures = __class__.__failures.get((userID, tokenType), 0) + 1
+        __class__.__failures[(userID, tokenType)] = failures
+
+        delay = min(REFRESH.RETRY_DELAY * 2 ** (failures - 1), REFRESH.MAX_RETRY_DELAY)
+        __class__.schedule(userID, tokenType, int(time() + REFRESH.LEAD_TIME + delay))
+        return delay
@@ -1,16 +1,18 @@
-import requests
-
 from base64 import urlsafe_b64encode
 from hashlib import sha256
 from os import urandom
 from urllib.parse import urlencode
 from re import search
-from json import loads, dumps
+from json import loads
 from enum import Enum, IntEnum, auto
 from dataclasses import dataclass
 from copy import copy
+from time import time
 from typing import Self
-from NSOAuth.VersionManager import VersionInfo
+from NSOAuth.VersionManager import VersionInfo, VersionManager
+from Helpers.HTTPClient import HTTPClient
+from NSOAuth.FAPIClient import FAPIClient
+from Helpers.JWT import resolveExpiry
 
 import Config
 
@@ -99,17 +101,31 @@ class WebAPIResult(TKResult):
 @dataclass(init=False)
 class StringResult(TKResult):
     value: str
+    expiresAt: int|None = None
+
+@dataclass(init=False)
+class RefreshChainResult(TKResult):
+    userInfo:    NinUserResult
+    webAPI:      WebAPIResult
+    gToken:      str
+    bulletToken: str
+    gTokenExpiresAt:      int
+    bulletTokenExpiresAt: int
 
 
 # MANAGING CLASS ----------
 class TokenManager:
     """ Manages authentication to NSO Services. """
 
+    # Nintendo user info shared by every instance, Session Token -> (expiresAt, result).
+    __ninUserCache: dict[str, tuple[float, NinUserResult]] = {}
+
     # Public Methods ----------
-    def __init__(self, verInfo: VersionInfo) -> None:
-        self.verInfo = verInfo
-    
-        self.cachedNinUserInfo = None
+    def __init__(self, verInfo: VersionInfo|None = None, fClient: FAPIClient|None = None) -> None:
+        """ Uses the versions in the in-memory registry and the configured f-API
+            providers unless a VersionInfo or FAPIClient is given. """
+        self.verInfo = verInfo if verInfo is not None else VersionManager.registry().versions
+        self.fClient = fClient if fClient is not None else FAPIClient.default()
 
 
     async def generateNSOLoginLink(self) -> AuthURLResult:
@@ -161,30 +177,28 @@ class TokenManager:
         	'Accept-Language': 'en-US',
         	'Accept':          'application/json',
         	'Content-Type':    'application/x-www-form-urlencoded',
-        	'Content-Length':  '540',
-        	'Host':            'accounts.nintendo.com',
-        	'Connection':      'Keep-Alive',
         	'Accept-Encoding': 'gzip'
         }
 
         body = {
         	'client_id':                   '71b963c1b7b6d119',
         	'session_token_code':          sessionCode,
-        	'session_token_code_verifier': authInfo.verifier
+        	'session_token_code_verifier': authInfo.verifier.decode()
         }
 
         url = 'https://accounts.nintendo.com/connect/1.0.0/api/session_token'
 
         try:
-            with requests.Session() as requestSession:
-                request = requestSession.post(url, headers=appHead, data=body)
-                sessionToken = loads(request.text)["session_token"]
+            request = await HTTPClient.post(url, headers=appHead, data=body)
+            sessionRes   = loads(request.text)
+            sessionToken = sessionRes["session_token"]
         except Exception:
             return StringResult().statusError(TKError.GET_FAILURE, f"Unable to get Session Token.")
         
         
         returnVal = StringResult()
         returnVal.value = sessionToken
+        returnVal.expiresAt = resolveExpiry(sessionToken, sessionRes.get("expires_in"), Config.EXP_OFFSET.SESSION)
 
         return returnVal.statusOK()
     
@@ -198,13 +212,13 @@ class TokenManager:
         if res.status != Status.OK:
             return StringResult().statusError(res.errorType, res.message)
         
-        webAPI = self.__getWebAPIToken(ninUserInfo)
+        webAPI = await self.__getWebAPIToken(ninUserInfo)
 
         res = webAPI.result
         if res.status != Status.OK:
             return StringResult().statusError(res.errorType, res.message)
         
-        return self.__getGToken(ninUserInfo, webAPI)
+        return await self.__getGToken(ninUserInfo, webAPI)
 
 
     async def generateBulletToken(self, sessionToken: str, gToken: str) -> StringResult:
@@ -216,24 +230,62 @@ class TokenManager:
         if res.status != Status.OK:
             return StringResult().statusError(res.errorType, res.message)
         
-        return self.__getBulletToken(ninUserInfo, gToken)
-        
+        return await self.__getBulletToken(ninUserInfo, gToken)
+
+
+    async def runRefreshChain(self, sessionToken: str) -> RefreshChainResult:
+        """ Run the full Session -> ID/Access -> WebAPI -> GToken -> Bullet chain,
+            performing each upstream step exactly once. """
+
+        ninUserInfo = await self.getNintendoUserInfo(sessionToken)
+
+        res = ninUserInfo.result
+        if res.status != Status.OK:
+            return RefreshChainResult().statusError(res.errorType, res.message)
+
+        webAPI = await self.__getWebAPIToken(ninUserInfo)
+
+        res = webAPI.result
+        if res.status != Status.OK:
+            return RefreshChainResult().statusError(res.errorType, res.message)
+
+        gToken = await self.__getGToken(ninUserInfo, webAPI)
+
+        res = gToken.result
+        if res.status != Status.OK:
+            return RefreshChainResult().statusError(res.errorType, res.message)
+
+        bulletToken = await self.__getBulletToken(ninUserInfo, gToken.value)
+
+        res = bulletToken.result
+        if res.status != Status.OK:
+            return RefreshChainResult().statusError(res.errorType, res.message)
+
+        chain = RefreshChainResult()
+        chain.userInfo    = ninUserInfo
+        chain.webAPI      = webAPI
+        chain.gToken      = gToken.value
+        chain.bulletToken = bulletToken.value
+        chain.gTokenExpiresAt      = gToken.expiresAt
+        chain.bulletTokenExpiresAt = bulletToken.expiresAt
+
+        return chain.statusOK()
+
 
     async def getNintendoUserInfo(self, sessionToken: str, useCachedResult: bool = True) -> NinUserResult:
         """ Request a user's information with their Session Token. """
 
-        if self.cachedNinUserInfo and useCachedResult:
-            return self.cachedNinUserInfo
-        
+        if useCachedResult:
+            cacheEntry = self.__ninUserCache.get(sessionToken)
+            if cacheEntry and cacheEntry[0] > time():
+                return cacheEntry[1]
+
         ninUser = NinUserResult()
 
         appHead = {
-        	'Host':            'accounts.nintendo.com',
         	'Accept-Encoding': 'gzip',
         	'Content-Type':    'application/json',
-        	'Content-Length':  '436',
         	'Accept':          'application/json',
-        	'Connection':      'Keep-Alive',
         	'User-Agent':      'Dalvik/2.1.0 (Linux; U; Android 7.1.2)'
         }
 
@@ -245,9 +297,9 @@ class TokenManager:
 
         try:
             url = "https://accounts.nintendo.com/connect/1.0.0/api/token"
-            r = requests.post(url, headers=appHead, json=body)
+            r = await HTTPClient.post(url, headers=appHead, json=body)
 
-            match(r.status_code):
+            match(r.status):
                 case 400:
                     return NinUserResult().statusError(TKError.GET_FAILURE, "Session Token was incorrect.")
                 case 401:
@@ -256,6 +308,7 @@ class TokenManager:
             res = loads(r.text)
             ninUser.idToken     = res["id_token"]
             ninUser.accessToken = res["access_token"]
+            tokenLifetime       = res.get("expires_in", Config.NIN_USER_CACHE.TTL)
         except Exception:
             return NinUserResult().statusError(TKError.GET_FAILURE, "Unable to get ID/Access Token.")
         
@@ -264,14 +317,12 @@ class TokenManager:
         	'Content-Type':    'application/json',
         	'Accept':          'application/json',
         	'Authorization':   f'Bearer {ninUser.accessToken}',
-        	'Host':            'api.accounts.nintendo.com',
-        	'Connection':      'Keep-Alive',
         	'Accept-Encoding': 'gzip'
         }
 
         try:
             url = "https://api.accounts.nintendo.com/2.0.0/users/me"
-            r = requests.get(url, headers=appHead)
+            r = await HTTPClient.get(url, headers=appHead)
             userInfo = loads(r.text)
             
             ninUser.nickname  = userInfo["nickname"]
@@ -287,13 +338,31 @@ class TokenManager:
         
         cachedCopy = copy(okResult)
         cachedCopy.cached = True
-        self.cachedNinUserInfo = cachedCopy
+        self.__cacheNinUserInfo(sessionToken, cachedCopy, tokenLifetime)
 
         return okResult
 
 
     # Private Helper Methods ----
-    def __generateFToken(self, fStep: int, idToken: str, accountID: str|None = None, coralID: str|None = None) -> FToken:
+    def __cacheNinUserInfo(self, sessionToken: str, userInfo: NinUserResult, tokenLifetime: int) -> None:
+        """ Store user info in the shared cache while its ID/Access tokens stay valid. """
+
+        now = time()
+        ttl = min(Config.NIN_USER_CACHE.TTL, tokenLifetime - Config.NIN_USER_CACHE.EXPIRY_MARGIN)
+        if ttl <= 0:
+            return
+
+        cache = self.__ninUserCache
+        if len(cache) >= Config.NIN_USER_CACHE.MAX_ENTRIES:
+            for key in [key for key, (expiresAt, _) in cache.items() if expiresAt <= now]:
+                del cache[key]
+            if len(cache) >= Config.NIN_USER_CACHE.MAX_ENTRIES:
+                del cache[next(iter(cache))]
+
+        cache[sessionToken] = (now + ttl, userInfo)
+
+
+    async def __generateFToken(self, fStep: int, idToken: str, accountID: str|None = None, coralID: str|None = None) -> FToken:
         """ Reach out to the fAPI and request an 'f' token.
         
             All hash methods suggest supplying the Nintendo Account ID.
@@ -317,8 +386,7 @@ class TokenManager:
             apiBody['coral_user_id'] = coralID
 
         try:
-            apiResponse = requests.post(Config.F_ENDPOINT, data=dumps(apiBody), headers=apiHead)
-            res = loads(apiResponse.text)
+            res = await self.fClient.generate(apiBody, apiHead)
 
             f         = res["f"]
             uuid      = res["request_id"]
@@ -334,10 +402,10 @@ class TokenManager:
         return fToken.statusOK()
 
 
-    def __getWebAPIToken(self, userInfo: NinUserResult) -> WebAPIResult:
+    async def __getWebAPIToken(self, userInfo: NinUserResult) -> WebAPIResult:
         """ Using a user's information, generate a WebAccess token. """
 
-        resF = self.__generateFToken(FStep.LOGIN_TOKEN, userInfo.idToken, userInfo.accountID)
+        resF = await self.__generateFToken(FStep.LOGIN_TOKEN, userInfo.idToken, userInfo.accountID)
         
         if resF.result.status != Status.OK:
             return WebAPIResult().statusError(resF.result.errorType, resF.result.message)
@@ -346,8 +414,6 @@ class TokenManager:
         	'X-Platform':       'Android',
         	'X-ProductVersion': self.verInfo.nsoVersion,
         	'Content-Type':     'application/json; charset=utf-8',
-        	'Content-Length':   str(990 + len(resF.f)),
-        	'Connection':       'Keep-Alive',
         	'Accept-Encoding':  'gzip',
         	'User-Agent':       f'com.nintendo.znca/{self.verInfo.nsoVersion}(Android/7.1.2)',
         }
@@ -366,7 +432,7 @@ class TokenManager:
 
         try:
             url = "https://api-lp1.znc.srv.nintendo.net/v3/Account/Login"
-            r = requests.post(url, headers=appHead, json=body)
+            r = await HTTPClient.post(url, headers=appHead, json=body)
             result = loads(r.text)
 
             webLoginToken = result["result"]["webApiServerCredential"]["accessToken"]
@@ -381,17 +447,16 @@ class TokenManager:
         return ret.statusOK()
 
 
-    def __getGToken(self, userInfo: NinUserResult, webAPI: WebAPIResult) -> StringResult:
+    async def __getGToken(self, userInfo: NinUserResult, webAPI: WebAPIResult) -> StringResult:
         """ Using a WebAPI token, generate a WebService token."""
 
-        resF = self.__generateFToken(FStep.G_TOKEN, webAPI.webLoginToken, userInfo.accountID, webAPI.coralID)
+        resF = await self.__generateFToken(FStep.G_TOKEN, webAPI.webLoginToken, userInfo.accountID, webAPI.coralID)
 
         appHead = {
         	'X-Platform':       'Android',
         	'X-ProductVersion': self.verInfo.nsoVersion,
         	'Authorization':    f'Bearer {webAPI.webLoginToken}',
         	'Content-Type':     'application/json; charset=utf-8',
-        	'Content-Length':   '391',
         	'Accept-Encoding':  'gzip',
         	'User-Agent':       f'com.nintendo.znca/{self.verInfo.nsoVersion}(Android/7.1.2)'
         }
@@ -408,22 +473,23 @@ class TokenManager:
 
         try:
             url = "https://api-lp1.znc.srv.nintendo.net/v2/Game/GetWebServiceToken"
-            result = requests.post(url, headers=appHead, json=body)
-            gToken = loads(result.text)["result"]["accessToken"]
+            result = await HTTPClient.post(url, headers=appHead, json=body)
+            gTokenRes = loads(result.text)["result"]
+            gToken    = gTokenRes["accessToken"]
         except Exception:
             return StringResult().statusError(TKError.GET_FAILURE, "Unable to get GToken.")
 
         stringRes = StringResult()
         stringRes.value = gToken
+        stringRes.expiresAt = resolveExpiry(gToken, gTokenRes.get("expiresIn"), Config.EXP_OFFSET.GTOKEN)
         
         return stringRes.statusOK()
 
 
-    def __getBulletToken(self, userInfo: NinUserResult, gToken: str) -> StringResult:
+    async def __getBulletToken(self, userInfo: NinUserResult, gToken: str) -> StringResult:
         """ Using a WebService token, request a Bullet token. """
 
         appHead = {
-        	'Content-Length':   '0',
         	'Content-Type':     'application/json',
         	'Accept-Language':  userInfo.language,
         	'User-Agent':       'Mozilla/5.0 (Linux; Android 11; Pixel 5) ' \
@@ -442,9 +508,9 @@ class TokenManager:
 
         try:
             url = 'https://api.lp1.av5ja.srv.nintendo.net/api/bullet_tokens'
-            r = requests.post(url, headers=appHead, cookies=appCookies)
+            r = await HTTPClient.post(url, headers=appHead, cookies=appCookies)
 
-            match(r.status_code):
+            match(r.status):
                 case 204:
                     return StringResult().statusError(TKError.USER_NOT_REGISTERED, "You must play at least one game online to use this application.")
                 case 401:
@@ -459,5 +525,6 @@ class TokenManager:
 
         token = StringResult()
         token.value = bulletToken
+        token.expiresAt = resolveExpiry(bulletToken, bulletRes.get("expiresIn"), Config.EXP_OFFSET.BULLET)
         
         return token.statusOK()
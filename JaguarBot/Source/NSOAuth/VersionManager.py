@@ -1,16 +1,56 @@
 from sqlalchemy import select
-from sqlalchemy.orm import Session
-import requests, json
+from sqlalchemy.dialects.sqlite import insert
+from asyncio import Task, create_task, gather, sleep
+import json
 from dataclasses import dataclass
+from types import MappingProxyType
 
 from Database.Models import AppVersion, GraphQLQuery
-from Database.Ext import getOrCreate
+from Database.Engine import SessionFactory
+from Helpers.HTTPClient import HTTPClient
+from Helpers.Logger import Logger
+from NSOAuth.GraphQL.PersistedQuery import PersistedQuery
+
+import Config
 
 @dataclass
 class VersionInfo:
     nsoVersion: str
     s3Version: str
 
+@dataclass(frozen=True)
+class VersionRegistry:
+    """ Immutable snapshot of the app versions and GraphQL persisted queries. """
+
+    # Persisted queries the bot sends. Without all of them the registry is refreshed before connecting.
+    REQUIRED_QUERIES = ("FriendListQuery", "StageScheduleQuery", "LatestBattleHistoriesQuery", "VsHistoryDetailQuery")
+
+    versions: VersionInfo
+    queries: MappingProxyType[str, PersistedQuery]
+
+    @staticmethod
+    def build(versions: VersionInfo, queryHashes: dict[str, str]) -> "VersionRegistry":
+        """ Create a registry, preparing every persisted query from its hash. """
+        return VersionRegistry(
+            versions,
+            MappingProxyType({name: PersistedQuery.fromHash(name, hash) for name, hash in queryHashes.items()})
+        )
+
+    def getQuery(self, name: str) -> PersistedQuery|None:
+        """ Return the persisted query for a given query Name, None if its hash is unknown. """
+        return self.queries.get(name)
+
+    def isComplete(self) -> bool:
+        """ Return whether both app versions and every required query are known. """
+        return self.versions.nsoVersion is not None and self.versions.s3Version is not None \
+            and all(name in self.queries for name in self.REQUIRED_QUERIES)
+
+@dataclass
+class ConditionalResult:
+    url: str
+    text: str
+    headers: dict[str, str]
+
 class VersionManager:
     """ Manages and updates the AppVersions in the Database. """
 
@@ -23,53 +63,152 @@ class VersionManager:
     GQL_UPDATE_URL = "https://raw.githubusercontent.com/imink-app/SplatNet3/master/Data/splatnet3_webview_data.json"
 
 
-    def __init__(self, dbSession: Session) -> None:
-        self.dbSession = dbSession
-    
+    # Shared by the whole process, replaced as a whole whenever the versions change.
+    __registry: VersionRegistry|None = None
 
-    def getAppVersions(self) -> VersionInfo:
-        """ Return a VersionInfo with NSO and S3 versions from the database."""
-        return VersionInfo(self.__nsoVersion(), self.__s3Version())
+    # Last ETag / Last-Modified seen per update URL.
+    __validators: dict[str, dict[str, str]] = {}
+    __refreshTask: Task|None = None
 
 
-    def updateVersions(self) -> bool:
-        """ Attempts to update the app versions from hosted API. """
-        try:
-            result = requests.get(self.NSO_UPDATE_URL)
-            nsoVersion = json.loads(result.text)["version"]
-            
-            result = requests.get(self.S3_UPDATE_URL)
-            s3Version = json.loads(result.text)["web_app_ver"]
-
-            result = requests.get(self.GQL_UPDATE_URL)
-            gqlHashes = json.loads(result.text)["graphql"]["hash_map"]
-        except Exception:
-            return False
-        else:
-            self.__getEntry(self.NSO_VALUE_NAME).version = nsoVersion
-            self.__getEntry(self.S3_VALUE_NAME).version  = s3Version
-            
-            for name, hash in gqlHashes.items():
-                self.__getHashObj(name).hash = hash
+    def __init__(self, dbSessions: SessionFactory) -> None:
+        self.dbSessions = dbSessions
+    
 
-            self.dbSession.commit()
+    @staticmethod
+    def registry() -> VersionRegistry:
+        """ Return the in-memory registry. `loadRegistry` must have been awaited first. """
+        if __class__.__registry is None:
+            raise RuntimeError("The version registry has not been loaded.")
+        return __class__.__registry
 
-            return True
 
+    async def loadRegistry(self) -> VersionRegistry:
+        """ Populate the in-memory registry from the versions stored in the database. """
+        async with self.dbSessions() as session:
+            versions = {entry.name: entry.version for entry in await session.scalars(select(AppVersion))}
+            hashes   = {entry.name: entry.hash    for entry in await session.scalars(select(GraphQLQuery))}
 
-    def __s3Version(self) -> str:
-        """ Return the S3 Applet version stored in the DB. """
-        return self.__getEntry(self.S3_VALUE_NAME).version
-    
-    def __nsoVersion(self) -> str:
-        """ Return the NSO App Version Stored in the DB. """
-        return self.__getEntry(self.NSO_VALUE_NAME).version
+        __class__.__registry = VersionRegistry.build(
+            VersionInfo(versions.get(self.NSO_VALUE_NAME), versions.get(self.S3_VALUE_NAME)),
+            hashes
+        )
+        return __class__.__registry
 
-    def __getEntry(self, name: str) -> AppVersion:
-        """ Internal helper method to retrieve AppVersion objects. """
-        return getOrCreate(self.dbSession, AppVersion, name=name)
-    
-    def __getHashObj(self, name: str) -> GraphQLQuery:
-        """ Internal helper method to retrieve AppVersion objects. """
-        return getOrCreate(self.dbSession, GraphQLQuery, name=name)
 
+    async def updateVersions(self) -> bool:
+        """ Attempts to update the app versions from hosted API.
+
+            The three sources are fetched concurrently and revalidated with their
+            ETag / Last-Modified, so an unchanged source costs a 304 and no writes. """
+        try:
+            nsoRes, s3Res, gqlRes = await gather(
+                self.__fetchIfChanged(self.NSO_UPDATE_URL),
+                self.__fetchIfChanged(self.S3_UPDATE_URL),
+                self.__fetchIfChanged(self.GQL_UPDATE_URL)
+            )
+
+            current = __class__.__registry
+            nsoVersion = json.loads(nsoRes.text)["version"]             if nsoRes else current.versions.nsoVersion
+            s3Version  = json.loads(s3Res.text)["web_app_ver"]          if s3Res  else current.versions.s3Version
+            gqlHashes  = json.loads(gqlRes.text)["graphql"]["hash_map"] if gqlRes else {}
+        except Exception:
+            return False
+
+        knownHashes = {name: query.sha256Hash for name, query in current.queries.items()} if current else {}
+        knownVersions = {
+            self.NSO_VALUE_NAME: current.versions.nsoVersion if current else None,
+            self.S3_VALUE_NAME:  current.versions.s3Version  if current else None
+        }
+
+        changedVersions = [
+            {"name": name, "version": version}
+            for name, version in ((self.NSO_VALUE_NAME, nsoVersion), (self.S3_VALUE_NAME, s3Version))
+            if knownVersions[name] != version
+        ]
+        changedHashes = [
+            {"name": name, "hash": hash}
+            for name, hash in gqlHashes.items()
+            if knownHashes.get(name) != hash
+        ]
+
+        if changedVersions or changedHashes:
+            try:
+                async with self.dbSessions() as session:
+                    if changedVersions:
+                        stmt = insert(AppVersion).values(changedVersions)
+                        await session.execute(stmt.on_conflict_do_update(
+                            index_elements=[AppVersion.name], set_={"version": stmt.excluded.version}
+                        ))
+
+                    if changedHashes:
+                        stmt = insert(GraphQLQuery).values(changedHashes)
+                        await session.execute(stmt.on_conflict_do_update(
+                            index_elements=[GraphQLQuery.name], set_={"hash": stmt.excluded.hash}
+                        ))
+
+                    await session.commit()
+            except Exception:
+                return False
+
+            knownHashes.update(gqlHashes)
+
+            __class__.__registry = VersionRegistry.build(VersionInfo(nsoVersion, s3Version), knownHashes)
+
+        # Only remember validators once their content is safely stored.
+        for response in (nsoRes, s3Res, gqlRes):
+            if response:
+                __class__.__validators[response.url] = response.headers
+
+        return True
+
+
+    @staticmethod
+    def startRefreshLoop(dbSessions: SessionFactory) -> None:
+        """ Call `updateVersions` now and then periodically in the background. """
+        if __class__.__refreshTask is None:
+            __class__.__refreshTask = create_task(__class__.__refreshLoop(dbSessions))
+
+
+    @staticmethod
+    def stopRefreshLoop() -> None:
+        """ Stop the background version refresh. """
+        if __class__.__refreshTask is not None:
+            __class__.__refreshTask.cancel()
+            __class__.__refreshTask = None
+
+
+    @staticmethod
+    async def __refreshLoop(dbSessions: SessionFactory) -> None:
+        """ Internal loop that refreshes the versions on the configured interval. """
+        logger = Logger("VersionManager")
+        while True:
+            if await VersionManager(dbSessions).updateVersions():
+                logger.log("Got the latest versions!")
+            else:
+                logger.warn("Failed to refresh the application versions.")
+            await sleep(Config.VERSION_REFRESH_INTERVAL)
+
+
+    async def __fetchIfChanged(self, url: str) -> ConditionalResult|None:
+        """ Internal helper that GETs a URL, returning None if it has not changed
+            since the last successful update. """
+        headers = {}
+        validators = __class__.__validators.get(url)
+        if validators is not None:
+            if "ETag" in validators:
+                headers["If-None-Match"] = validators["ETag"]
+            if "Last-Modified" in validators:
+                headers["If-Modified-Since"] = validators["Last-Modified"]
+
+        result = await HTTPClient.get(url, headers=headers)
+
+        match result.status:
+            case 304:
+                return None
+            case 200:
+                return ConditionalResult(url, result.text, {
+                    key: result.headers[key] for key in ("ETag", "Last-Modified") if key in result.headers
+                })
+            case _:
+                raise ValueError(f"Unexpected status {result.status} from {url}")
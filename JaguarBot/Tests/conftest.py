@@ -0,0 +1,5 @@
+import sys
+from os import path
+
+# Modules import each other relative to the 'Source' folder, as when the bot runs.
+sys.path.insert(0, path.join(path.dirname(path.abspath(__file__)), "..", "Source"))
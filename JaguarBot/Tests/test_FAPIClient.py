@@ -0,0 +1,171 @@
+""" FAPIClient against local stand-in f-API servers. """
+
+from asyncio import run, sleep
+from contextlib import asynccontextmanager
+from time import monotonic
+
+import pytest
+from aiohttp import web
+
+from Config import F_API
+from Helpers.HTTPClient import HTTPClient
+from NSOAuth.FAPIClient import FAPIClient
+
+
+BODY = {"token": "idToken", "hash_method": 1}
+HEADERS = {"Content-Type": "application/json; charset=utf-8"}
+
+
+def answering(name: str, delay: float = 0):
+    """ A handler that answers with an f token named after the server, after `delay` seconds. """
+    async def handler(request: web.Request) -> web.Response:
+        assert await request.json() == BODY
+        await sleep(delay)
+        return web.json_response({"f": name, "request_id": f"{name}-id", "timestamp": 0})
+    return handler
+
+
+async def failing(request: web.Request) -> web.Response:
+    return web.Response(status=500)
+
+
+@asynccontextmanager
+async def servers(*handlers):
+    """ Start one server on 127.0.0.1 per handler, yielding their URLs in the same order. """
+    runners = []
+    urls = []
+    try:
+        for handler in handlers:
+            app = web.Application()
+            app.router.add_post("/f", handler)
+            runner = web.AppRunner(app)
+            await runner.setup()
+            site = web.TCPSite(runner, "127.0.0.1", 0)
+            await site.start()
+            runners.append(runner)
+            urls.append(f"http://127.0.0.1:{runner.addresses[0][1]}/f")
+        yield urls
+    finally:
+        await HTTPClient.close()
+        for runner in runners:
+            await runner.cleanup()
+
+
+@pytest.fixture
+def fastHedging(monkeypatch):
+    """ Hedge after 0.1s instead of waiting for real latency samples. """
+    monkeypatch.setattr(F_API, "HEDGE_DEFAULT_DELAY", 0.1)
+    monkeypatch.setattr(F_API, "HEDGE_MIN_DELAY", 0.05)
+
+
+def test_fails_over_to_the_next_provider():
+    async def scenario():
+        async with servers(failing, answering("ok")) as urls:
+            client = FAPIClient(urls, hedge=False)
+            result = await client.generate(BODY, HEADERS)
+
+        broken, healthy = client.providers
+        assert result["f"] == "ok"
+        assert (broken.requests, broken.failures) == (1, 1)
+        assert (healthy.requests, healthy.successes) == (1, 1)
+        assert healthy.ewmaLatency is not None
+
+    run(scenario())
+
+
+def test_benches_a_provider_after_max_failures():
+    async def scenario():
+        async with servers(failing, answering("ok")) as urls:
+            client = FAPIClient(urls, hedge=False)
+            for _ in range(F_API.MAX_FAILURES + 2):
+                assert (await client.generate(BODY, HEADERS))["f"] == "ok"
+
+        broken, healthy = client.providers
+        assert broken.requests == F_API.MAX_FAILURES
+        assert not broken.isHealthy(monotonic())
+        assert healthy.successes == F_API.MAX_FAILURES + 2
+
+    run(scenario())
+
+
+def test_raises_when_every_provider_fails():
+    async def scenario():
+        async with servers(failing, failing) as urls:
+            client = FAPIClient(urls, hedge=False)
+            with pytest.raises(RuntimeError):
+                await client.generate(BODY, HEADERS)
+
+        assert [provider.failures for provider in client.providers] == [1, 1]
+
+    run(scenario())
+
+
+def test_hedges_a_slow_provider(fastHedging):
+    async def scenario():
+        async with servers(answering("slow", delay=2), answering("fast")) as urls:
+            client = FAPIClient(urls, hedge=True)
+            start = monotonic()
+            result = await client.generate(BODY, HEADERS)
+            elapsed = monotonic() - start
+
+        slow, fast = client.providers
+        assert result["f"] == "fast"
+        assert elapsed < 1
+        assert (fast.hedges, fast.hedgeWins) == (1, 1)
+        # The slow request is cancelled, which is not held against the provider.
+        assert (slow.requests, slow.successes, slow.failures) == (1, 0, 0)
+
+    run(scenario())
+
+
+def test_hedges_after_the_p95_latency(fastHedging, monkeypatch):
+    monkeypatch.setattr(F_API, "HEDGE_MIN_SAMPLES", 5)
+
+    async def scenario():
+        async with servers(answering("slow", delay=2), answering("fast")) as urls:
+            client = FAPIClient(urls, hedge=True)
+            slow, fast = client.providers
+            # A provider that usually answers in 0.2s, so the hedge waits 0.2s rather than 0.1s.
+            slow.latencies.extend([0.2] * 10)
+            slow.ewmaLatency = 0.01
+            fast.ewmaLatency = 0.05
+
+            start = monotonic()
+            result = await client.generate(BODY, HEADERS)
+            elapsed = monotonic() - start
+
+        assert result["f"] == "fast"
+        assert 0.2 <= elapsed < 1
+        assert (fast.hedges, fast.hedgeWins) == (1, 1)
+
+    run(scenario())
+
+
+def test_no_hedge_when_the_first_provider_answers_in_time(fastHedging):
+    async def scenario():
+        async with servers(answering("first"), answering("second")) as urls:
+            client = FAPIClient(urls, hedge=True)
+            result = await client.generate(BODY, HEADERS)
+
+        first, second = client.providers
+        assert result["f"] == "first"
+        assert (first.requests, first.hedges) == (1, 0)
+        assert (second.requests, second.hedges) == (0, 0)
+
+    run(scenario())
+
+
+def test_prefers_the_provider_with_the_lowest_latency():
+    async def scenario():
+        async with servers(answering("a"), answering("b")) as urls:
+            client = FAPIClient(urls, hedge=False)
+            a, b = client.providers
+            a.ewmaLatency = 0.5
+            b.ewmaLatency = 0.1
+
+            result = await client.generate(BODY, HEADERS)
+
+        assert result["f"] == "b"
+        assert a.requests == 0
+
+    run(scenario())
@@ -0,0 +1,147 @@
+""" GQLRequest against a stand-in SplatNet3. """
+
+from asyncio import CancelledError, Event, run, sleep
+from contextlib import aclosing
+from json import dumps, loads
+from time import time
+
+import pytest
+from multidict import CIMultiDict
+
+from Database.Models import TokenSet, TokenInfo
+from Helpers.HTTPClient import HTTPClient, HTTPResponse
+from NSOAuth.VersionManager import VersionManager, VersionRegistry, VersionInfo
+from NSOAuth.GraphQL.GQLRequest import GQLRequest
+from NSOAuth.GraphQL.ResponseCache import GQLResponseCache
+
+
+PAGES = [[1, 2], [3, 4], [5]]
+CONNECTION_PATH = ("data", "history")
+
+
+class PagedQuery(GQLRequest):
+    """ A cached query whose STREAM_PATH would stop at the first node, which pages must not use. """
+    CACHE_TTL = 60
+    STREAM_PATH = ("data", "history", "nodes")
+
+    def __init__(self, tokens: TokenSet) -> None:
+        self.queryName = "PagedQuery"
+        self.loggerName = "PagedQuery"
+        super().__init__(None, tokens)
+
+    def decodeNode(self, node: dict) -> int:
+        return node["n"]
+
+    def keepParsing(self, node: int) -> bool:
+        return False
+
+
+class CachedQuery(GQLRequest):
+    """ A cached query decoded whole. """
+    CACHE_TTL = 60
+
+    def __init__(self, tokens: TokenSet) -> None:
+        self.queryName = "CachedQuery"
+        self.loggerName = "CachedQuery"
+        super().__init__(None, tokens)
+
+
+def page(index: int) -> str:
+    """ The response for page `index`, with its cursor pointing at the next page. """
+    return dumps({"data": {"history": {
+        "nodes": [{"n": n} for n in PAGES[index]],
+        "pageInfo": {"hasNextPage": index + 1 < len(PAGES), "endCursor": str(index + 1)}
+    }}})
+
+
+class StandIn:
+    """ Answers each page, recording the cursors asked for. Pages in `held` wait until released. """
+
+    def __init__(self, held: tuple[int, ...] = ()) -> None:
+        self.cursors = []
+        self.held = held
+        self.release = Event()
+        self.cancelled = []
+
+    async def post(self, url: str, headers: dict, data: str, cookies: dict) -> HTTPResponse:
+        index = int(loads(data)["variables"].get("cursor", 0))
+        self.cursors.append(index)
+        if index in self.held:
+            try:
+                await self.release.wait()
+            except CancelledError:
+                self.cancelled.append(index)
+                raise
+        return HTTPResponse(200, page(index), CIMultiDict())
+
+
+async def settle() -> None:
+    """ Let the tasks started so far run up to their next real wait. """
+    for _ in range(5):
+        await sleep(0)
+
+
+@pytest.fixture
+def tokens(monkeypatch) -> TokenSet:
+    """ Unexpired tokens for a User, with the query in the version registry. """
+    registry = VersionRegistry.build(VersionInfo("1.0.0", "1.0.0"), {"PagedQuery": "0" * 64, "CachedQuery": "1" * 64})
+    monkeypatch.setattr(VersionManager, "_VersionManager__registry", registry)
+
+    valid = TokenInfo("value", int(time()) + 3600)
+    return TokenSet(1, 10, "en-US", "US", valid, valid, valid)
+
+
+def test_walks_every_page(tokens, monkeypatch):
+    standIn = StandIn()
+    monkeypatch.setattr(HTTPClient, "post", standIn.post)
+
+    async def scenario():
+        return [node async for node in PagedQuery(tokens).iterNodes(CONNECTION_PATH)]
+
+    assert run(scenario()) == [1, 2, 3, 4, 5]
+    assert standIn.cursors == [0, 1, 2]
+    # Pages are neither decoded with STREAM_PATH nor kept in the response cache.
+    for cursor in ({}, {"cursor": "1"}, {"cursor": "2"}):
+        assert GQLResponseCache.get((1, "PagedQuery", dumps(cursor, sort_keys=True))) is None
+
+
+def test_prefetches_the_next_page(tokens, monkeypatch):
+    standIn = StandIn()
+    monkeypatch.setattr(HTTPClient, "post", standIn.post)
+
+    async def scenario():
+        async with aclosing(PagedQuery(tokens).iterNodes(CONNECTION_PATH)) as nodes:
+            assert await anext(nodes) == 1
+            await settle()
+            # The second page is requested before the first one is done with.
+            assert standIn.cursors == [0, 1]
+
+    run(scenario())
+
+
+def test_stopping_early_cancels_the_prefetch(tokens, monkeypatch):
+    standIn = StandIn(held=(1,))
+    monkeypatch.setattr(HTTPClient, "post", standIn.post)
+
+    async def scenario():
+        async with aclosing(PagedQuery(tokens).iterNodes(CONNECTION_PATH)) as nodes:
+            async for node in nodes:
+                await settle()
+                break
+        await settle()
+
+        assert standIn.cursors == [0, 1]
+        assert standIn.cancelled == [1]
+
+    run(scenario())
+
+
+def test_graphql_errors_fail_the_request_uncached(tokens, monkeypatch):
+    async def post(url: str, headers: dict, data: str, cookies: dict) -> HTTPResponse:
+        body = {"errors": [{"message": "Unknown persisted query"}], "data": None}
+        return HTTPResponse(200, dumps(body), CIMultiDict())
+
+    monkeypatch.setattr(HTTPClient, "post", post)
+
+    assert not run(CachedQuery(tokens).sendGQLRequest(day=1))
+    assert GQLResponseCache.get((1, "CachedQuery", dumps({"day": 1}))) is None